@@ -54,7 +54,7 @@ function usage {
 root=`pwd`
 venv=$root/.venv
 with_venv=tools/with_venv.sh
-included_dirs="tuskar_sat_ui tuskar_boxes"
+included_dirs="tuskar_sat_ui tuskar_boxes tuskar_ui_extras"
 
 always_venv=0
 backup_env=0
@@ -317,7 +317,7 @@ function run_tests_all {
     export NOSE_HTML_OUT_FILE='tuskar_ui_extras_nose_results.html'
   fi
   ${command_wrapper} ${COVERAGE_CMD} erase
-  ${command_wrapper} ${COVERAGE_CMD} run -p $root/manage.py test tuskar_boxes tuskar_sat_ui --settings=test.settings $testopts
+  ${command_wrapper} ${COVERAGE_CMD} run -p $root/manage.py test tuskar_boxes tuskar_sat_ui tuskar_ui_extras --settings=test.settings $testopts
   # get results of the Horizon tests
   TUSKAR_UI_RESULT=$?
 
@@ -0,0 +1,283 @@
+# -*- coding: utf8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmarks of the boxes overview with synthetic inventories.
+
+The benchmarks are not part of the regular test run. Run them with::
+
+    ./run_tests.sh tuskar_boxes.overview.benchmarks
+
+The node counts to try are taken from the TUSKAR_BOXES_BENCHMARK_NODES
+environment variable (a comma-separated list), and the results are written
+as JSON to the file named by TUSKAR_BOXES_BENCHMARK_OUTPUT. The shape of
+the inventories is set by TUSKAR_BOXES_BENCHMARK_FLAVORS and
+TUSKAR_BOXES_BENCHMARK_ROLES, the numbers of flavors and deployment roles,
+and by TUSKAR_BOXES_BENCHMARK_DEPLOYED, the share of the nodes that is
+deployed (between 0 and 1).
+
+The page has to stay linear in the number of nodes: the benchmark fails if
+the time per node of a larger inventory is more than
+TUSKAR_BOXES_BENCHMARK_TOLERANCE times that of the next smaller one.
+"""
+
+import collections
+import json
+import os
+import platform
+import random
+import time
+
+from django.core import cache
+from django.core import urlresolvers
+from django.template import response
+import mock
+from tuskar_ui import api
+from tuskar_ui.infrastructure.overview import tests
+from tuskar_ui.test import helpers
+
+from tuskar_boxes.overview import inventory
+from tuskar_boxes.overview import views
+
+
+INDEX_URL = urlresolvers.reverse(
+    'horizon:infrastructure:overview:index')
+NODES_ENV = 'TUSKAR_BOXES_BENCHMARK_NODES'
+OUTPUT_ENV = 'TUSKAR_BOXES_BENCHMARK_OUTPUT'
+TOLERANCE_ENV = 'TUSKAR_BOXES_BENCHMARK_TOLERANCE'
+FLAVORS_ENV = 'TUSKAR_BOXES_BENCHMARK_FLAVORS'
+ROLES_ENV = 'TUSKAR_BOXES_BENCHMARK_ROLES'
+DEPLOYED_ENV = 'TUSKAR_BOXES_BENCHMARK_DEPLOYED'
+DEFAULT_NODES = '100,1000,10000,50000'
+DEFAULT_OUTPUT = 'tuskar_boxes_benchmark.json'
+DEFAULT_TOLERANCE = '2.0'
+DEFAULT_FLAVORS = '20'
+DEFAULT_ROLES = '4'
+DEFAULT_DEPLOYED = '0.8'
+CPU_ARCHS = ('x86_64', 'i386')
+NODE_STATES = (
+    api.node.FREE_STATE,
+    api.node.PROVISIONING_STATE,
+    api.node.PROVISIONED_STATE,
+    api.node.PROVISIONING_FAILED_STATE,
+)
+
+
+def synthetic_inventory(nodes, flavors=20, roles=4, deployed=0.8, seed=0):
+    """Generates a reproducible inventory of the given size.
+
+       Most nodes get the hardware profile of one of the flavors, the rest
+       get a random one. The given share of the nodes is deployed, spread
+       over the roles, and has a stack resource.
+    """
+    rng = random.Random(seed)
+    flavor_list = [inventory.FlavorRecord(
+        'flavor-%d' % i,
+        rng.choice((1, 2, 4, 8, 16)),
+        rng.choice((2048, 4096, 8192, 16384)),
+        rng.choice((20, 40, 100, 500)),
+        rng.choice(CPU_ARCHS),
+    ) for i in range(flavors)]
+    role_list = []
+    for i in range(roles):
+        role = mock.Mock(id='role-%d' % i)
+        role.name = 'Role %d' % i
+        role_list.append(role)
+
+    node_list = []
+    resource_list = []
+    for i in range(nodes):
+        if flavor_list and rng.random() < 0.9:
+            flavor = rng.choice(flavor_list)
+            profile = (flavor.vcpus, flavor.ram, flavor.disk,
+                       flavor.cpu_arch)
+        else:
+            profile = (rng.randint(1, 32), rng.randint(1, 64) * 1024,
+                       rng.randint(1, 100) * 10, rng.choice(CPU_ARCHS))
+        instance_uuid = None
+        state = api.node.FREE_STATE
+        if role_list and i < nodes * deployed:
+            instance_uuid = 'instance-%d' % i
+            state = rng.choice(NODE_STATES[1:])
+            resource_list.append(mock.Mock(
+                physical_resource_id=instance_uuid,
+                role=role_list[i % len(role_list)],
+                **{'node.instance.status': 'BUILD'}
+            ))
+        node_list.append(inventory.NodeRecord(
+            'node-%d' % i, instance_uuid, state, profile[3], profile[0],
+            profile[1], profile[2]))
+    return {
+        'nodes': node_list,
+        'flavors': flavor_list,
+        'roles': role_list,
+        'resources': resource_list,
+    }
+
+
+def scaling_violations(results, tolerance):
+    """Lists the results that grew faster than linearly.
+
+       The results of every mode are compared with those of the next
+       smaller inventory. Returns (mode, smaller nodes, larger nodes,
+       ratio) for every pair where the total time per node grew by more
+       than the tolerance.
+    """
+    by_mode = collections.defaultdict(list)
+    for result in results:
+        if result['nodes']:
+            by_mode[result['mode']].append(result)
+    violations = []
+    for mode, mode_results in sorted(by_mode.items()):
+        mode_results.sort(key=lambda result: result['nodes'])
+        for smaller, larger in zip(mode_results, mode_results[1:]):
+            if smaller['nodes'] == larger['nodes'] or not smaller['total']:
+                continue
+            ratio = ((larger['total'] / larger['nodes']) /
+                     (smaller['total'] / smaller['nodes']))
+            if ratio > tolerance:
+                violations.append(
+                    (mode, smaller['nodes'], larger['nodes'], ratio))
+    return violations
+
+
+class Timer(object):
+    """Collects how long the wrapped functions take."""
+
+    def __init__(self):
+        self.times = collections.defaultdict(float)
+
+    def wrap(self, name, function):
+        def timed(*args, **kwargs):
+            started = time.time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.times[name] += time.time() - started
+        return timed
+
+
+class BoxesBenchmarks(helpers.BaseAdminViewTests):
+    def setUp(self):
+        super(BoxesBenchmarks, self).setUp()
+        self.results = []
+
+    def _node_counts(self):
+        return [int(count) for count in
+                os.environ.get(NODES_ENV, DEFAULT_NODES).split(',')
+                if count.strip()]
+
+    def _inventory_shape(self):
+        return {
+            'flavors': int(os.environ.get(FLAVORS_ENV, DEFAULT_FLAVORS)),
+            'roles': int(os.environ.get(ROLES_ENV, DEFAULT_ROLES)),
+            'deployed': float(os.environ.get(DEPLOYED_ENV,
+                                             DEFAULT_DEPLOYED)),
+        }
+
+    def _run(self, mode, data, **headers):
+        """Requests the overview, timing its parts and counting calls."""
+        stack = None
+        if mode != 'edit':
+            stack = api.heat.Stack(tests.TEST_DATA.heatclient_stacks.first())
+        event = mock.Mock(event_time='2015-01-01T00:00:00Z',
+                          resource_name='Controller',
+                          resource_status='CREATE_IN_PROGRESS',
+                          resource_status_reason='state changed')
+        timer = Timer()
+        cache.cache.clear()
+        with (
+            tests._mock_plan(role_list=data['roles'] if stack else [])
+        ) as plan, (
+            mock.patch('tuskar_ui.api.heat.Stack.get_by_plan',
+                       return_value=stack)
+        ) as get_by_plan, (
+            mock.patch('tuskar_ui.api.heat.Stack.is_deleting', False)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.is_deploying', True)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.is_deployed', False)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.resources',
+                       return_value=data['resources'])
+        ) as resources, (
+            mock.patch('tuskar_ui.api.heat.Stack.events',
+                       new_callable=mock.PropertyMock,
+                       return_value=[event])
+        ) as events, (
+            mock.patch('tuskar_ui.api.node.Node.list',
+                       return_value=data['nodes'])
+        ) as node_list, (
+            mock.patch('tuskar_ui.api.flavor.Flavor.list',
+                       return_value=data['flavors'])
+        ) as flavor_list, (
+            mock.patch.object(views.IndexView, 'get_data', timer.wrap(
+                'get_data', views.IndexView.get_data))
+        ), (
+            mock.patch.object(views.IndexView, 'get_progress_data',
+                              timer.wrap('progress_data',
+                                         views.IndexView.get_progress_data))
+        ), (
+            mock.patch.object(views.IndexView, 'get_progress_update',
+                              timer.wrap(
+                                  'progress_update',
+                                  views.IndexView.get_progress_update))
+        ), (
+            mock.patch.object(response.SimpleTemplateResponse, 'render',
+                              timer.wrap(
+                                  'render',
+                                  response.SimpleTemplateResponse.render))
+        ):
+            started = time.time()
+            res = self.client.get(INDEX_URL, **headers)
+            total = time.time() - started
+        self.assertEqual(res.status_code, 200)
+        result = {
+            'mode': mode,
+            'nodes': len(data['nodes']),
+            'flavors': len(data['flavors']),
+            'roles': len(data['roles']),
+            'resources': len(data['resources']),
+            'total': total,
+            'calls': {
+                'Plan.get_the_plan': plan.get_the_plan.call_count,
+                'Stack.get_by_plan': get_by_plan.call_count,
+                'Stack.resources': resources.call_count,
+                'Stack.events': events.call_count,
+                'Node.list': node_list.call_count,
+                'Flavor.list': flavor_list.call_count,
+            },
+        }
+        result.update(timer.times)
+        self.results.append(result)
+        return result
+
+    def test_overview(self):
+        shape = self._inventory_shape()
+        for count in self._node_counts():
+            data = synthetic_inventory(count, **shape)
+            self._run('edit', data)
+            self._run('progress', data)
+            self._run('progress_update', data, HTTP_X_HORIZON_PROGRESS='true')
+
+        output = os.environ.get(OUTPUT_ENV, DEFAULT_OUTPUT)
+        with open(output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'numpy': views.numpy is not None,
+                'time': time.time(),
+                'results': self.results,
+            }, f, indent=2, sort_keys=True)
+
+        tolerance = float(os.environ.get(TOLERANCE_ENV, DEFAULT_TOLERANCE))
+        self.assertEqual(scaling_violations(self.results, tolerance), [])
@@ -12,17 +12,75 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import hashlib
+import json
 import logging
+import uuid
 
 import django.forms
+from django.utils import datastructures
 from django.utils.translation import ugettext_lazy as _
 import horizon.exceptions
 from tuskar_ui import api
 from tuskar_ui.infrastructure.overview import forms
 from tuskar_ui.infrastructure.parameters import forms as parameters_forms
+from tuskar_ui.utils import utils as tuskar_utils
+
+from tuskar_boxes.overview import inventory
+from tuskar_ui_extras import snapshot
 
 LOG = logging.getLogger(__name__)
 
+# The global parameter fields of each plan, by plan uuid, together with
+# the fingerprint of the parameter definitions they were built from.
+_parameter_fields = {}
+
+
+def _parameters_fingerprint(plan):
+    """Hashes the parameter definitions of the plan, without the values."""
+    definitions = [
+        dict((key, value) for (key, value) in parameter.items()
+             if key != 'value')
+        for parameter in plan.parameters
+    ]
+    return hashlib.sha1(
+        json.dumps(definitions, sort_keys=True, default=repr)).hexdigest()
+
+
+def global_parameter_fields(request, plan):
+    """Returns the fields of the global parameters, with current values.
+
+       Building the fields is slow for plans with many parameters, so they
+       are only built again when the parameter definitions of the plan
+       change. Every call gets its own copy, with the current values.
+    """
+    fingerprint = _parameters_fingerprint(plan)
+    cached_fingerprint, fields = _parameter_fields.get(plan.uuid,
+                                                       (None, None))
+    if cached_fingerprint != fingerprint:
+        fields = datastructures.SortedDict(
+            (name, field) for (name, field) in
+            parameters_forms.parameter_fields(request).iteritems()
+            if '::' not in name
+        )
+        _parameter_fields[plan.uuid] = (fingerprint, fields)
+    parameters = dict((parameter['name'], parameter)
+                      for parameter in plan.parameters)
+    copied = datastructures.SortedDict()
+    for name, field in fields.iteritems():
+        field = copy.deepcopy(field)
+        parameter = parameters.get(name)
+        if parameter is not None:
+            field.initial = parameter.get('value')
+            field.parameter = api.tuskar.Parameter(parameter, plan=plan)
+        copied[name] = field
+    return copied
+
+
+def invalidate_parameter_fields(plan):
+    _parameter_fields.pop(plan.uuid, None)
+
 
 class EditPlan(forms.EditPlan):
     def __init__(self, *args, **kwargs):
@@ -32,9 +90,10 @@ class EditPlan(forms.EditPlan):
     def _role_flavor_fields(self, plan):
         fields = {}
         for role in plan.role_list:
+            flavor = role.flavor(plan)
             field = django.forms.CharField(
                 label=_("Flavor for {0}").format(role.name),
-                initial=role.flavor(plan).name if role.flavor(plan) else '',
+                initial=flavor.name if flavor else '',
                 required=False,
                 widget=django.forms.HiddenInput(attrs={
                     'class': "boxes-flavor",
@@ -44,9 +103,65 @@ class EditPlan(forms.EditPlan):
             fields['%s-flavor' % role.id] = field
         return fields
 
-    def handle(self, request, data):
-        result = super(EditPlan, self).handle(request, data)
+    def _find_role(self, name):
+        try:
+            return self.plan.get_role_by_name(name)
+        except Exception:
+            LOG.warning('Unable to find role: %s', name)
+            return None
+
+    def _count_parameters(self, data):
+        """Builds the node count parameters, as the parent form does.
+
+           Besides the counts, the parameters that depend on them are set:
+           Neutron L3 HA and the DHCP agents for more than one Controller,
+           and the Ceph keys and backends when there are Ceph nodes. Each
+           of them only needs its own roles to be found in the plan.
+        """
         parameters = dict(
+            (field.role.node_count_parameter_name, data[name])
+            for (name, field) in self.fields.items() if name.endswith('-count')
+        )
+        controller_role = self._find_role('Controller')
+        compute_role = self._find_role('Compute')
+        ceph_storage_role = self._find_role('Ceph-Storage')
+
+        if controller_role and compute_role:
+            number_controllers = parameters.get(
+                controller_role.node_count_parameter_name) or 0
+            if number_controllers > 1:
+                # L3 HA replaces the failover of the L3 agents.
+                for role in [controller_role, compute_role]:
+                    parameters[role.parameter_prefix + 'NeutronL3HA'] = 'True'
+                    parameters[role.parameter_prefix +
+                               'NeutronAllowL3AgentFailover'] = 'False'
+                parameters[controller_role.parameter_prefix +
+                           'NeutronDhcpAgentsPerNetwork'] = max(
+                    number_controllers, 3)
+
+        if ceph_storage_role and (parameters.get(
+                ceph_storage_role.node_count_parameter_name) or 0) > 0:
+            parameters.update({
+                'CephClusterFSID': unicode(uuid.uuid4()),
+                'CephMonKey': tuskar_utils.create_cephx_key(),
+                'CephAdminKey': tuskar_utils.create_cephx_key(),
+            })
+            if controller_role:
+                prefix = controller_role.parameter_prefix
+                parameters.update({
+                    prefix + 'CinderEnableRbdBackend': True,
+                    prefix + 'GlanceBackend': 'rbd',
+                    prefix + 'CinderEnableIscsiBackend': False,
+                })
+            if compute_role:
+                parameters[compute_role.parameter_prefix +
+                           'NovaEnableRbdBackend'] = True
+        return parameters
+
+    def handle(self, request, data):
+        # The counts and the flavors are saved in a single update.
+        parameters = self._count_parameters(data)
+        parameters.update(
             (field.role.flavor_parameter_name, data[name])
             for (name, field) in self.fields.items()
             if name.endswith('-flavor')
@@ -57,7 +172,8 @@ class EditPlan(forms.EditPlan):
             horizon.exceptions.handle(request, _("Unable to update the plan."))
             LOG.exception(e)
             return False
-        return result
+        inventory.invalidate(request)
+        return True
 
     def clean(self):
         cleaned_data = super(EditPlan, self).clean()
@@ -72,14 +188,11 @@ class EditPlan(forms.EditPlan):
 class GlobalServiceConfig(horizon.forms.SelfHandlingForm):
     def __init__(self, *args, **kwargs):
         super(GlobalServiceConfig, self).__init__(*args, **kwargs)
-        self.fields.update({
-            k: v for (k, v) in
-            parameters_forms.parameter_fields(self.request).iteritems()
-            if '::' not in k
-        })
+        plan = snapshot.call(self.request, api.tuskar.Plan.get_the_plan)
+        self.fields.update(global_parameter_fields(self.request, plan))
 
     def handle(self, request, data):
-        plan = api.tuskar.Plan.get_the_plan(self.request)
+        plan = snapshot.call(self.request, api.tuskar.Plan.get_the_plan)
 
         try:
             plan.patch(request, plan.uuid, data)
@@ -90,6 +203,8 @@ class GlobalServiceConfig(horizon.forms.SelfHandlingForm):
             LOG.exception(e)
             return False
         else:
+            inventory.invalidate(request)
+            invalidate_parameter_fields(plan)
             horizon.messages.success(
                 request,
                 _("Service configuration updated."))
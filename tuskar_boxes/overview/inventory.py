@@ -0,0 +1,117 @@
+# -*- coding: utf8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Node and flavor inventories shared between requests.
+
+The inventories rarely change, so they are kept in Django's cache for
+TUSKAR_BOXES_INVENTORY_CACHE_TTL seconds, and invalidated explicitly by
+the views and forms that change them. Only the plain attributes used by
+the overview are cached, not the API objects themselves.
+
+The node states change while a deployment is in progress, so the progress
+updates list the nodes fresh, and refresh the cache with them. An empty
+listing is never cached, as that is also what a failed one looks like.
+"""
+
+import collections
+
+from django.conf import settings
+from django.core import cache
+from tuskar_ui import api
+
+from tuskar_ui_extras import snapshot
+
+
+INVENTORY_CACHE_TTL = 'TUSKAR_BOXES_INVENTORY_CACHE_TTL'
+DEFAULT_CACHE_TTL = 30
+INVENTORIES = ('nodes', 'flavors')
+
+
+class NodeRecord(collections.namedtuple('NodeRecord', [
+    'uuid',
+    'instance_uuid',
+    'state',
+    'cpu_arch',
+    'cpus',
+    'memory_mb',
+    'local_gb',
+])):
+    __slots__ = ()
+
+    @classmethod
+    def from_node(cls, node):
+        return cls(node.uuid, node.instance_uuid, node.state, node.cpu_arch,
+                   node.cpus, node.memory_mb, node.local_gb)
+
+
+class FlavorRecord(collections.namedtuple('FlavorRecord', [
+    'name',
+    'vcpus',
+    'ram',
+    'disk',
+    'cpu_arch',
+])):
+    __slots__ = ()
+
+    @classmethod
+    def from_flavor(cls, flavor):
+        return cls(flavor.name, flavor.vcpus, flavor.ram, flavor.disk,
+                   flavor.cpu_arch)
+
+
+def _cache_ttl():
+    return getattr(settings, INVENTORY_CACHE_TTL, DEFAULT_CACHE_TTL)
+
+
+def _cache_key(request, inventory):
+    return 'tuskar_boxes:inventory:%s:%s' % (
+        inventory, getattr(request.user, 'tenant_id', None))
+
+
+def _cached(request, inventory, load, fresh=False):
+    ttl = _cache_ttl()
+    if not ttl:
+        return load()
+    key = _cache_key(request, inventory)
+    records = None if fresh else cache.cache.get(key)
+    if records is None:
+        records = load()
+        if records:
+            cache.cache.set(key, records, ttl)
+    return records
+
+
+def list_nodes(request, fresh=False):
+    """Lists the nodes that are not in maintenance.
+
+    With fresh set, the nodes are listed from Ironic even if they are
+    cached, so that their states are current.
+    """
+    return _cached(request, 'nodes', lambda: [
+        NodeRecord.from_node(node) for node in
+        snapshot.call(request, api.node.Node.list, maintenance=False)
+    ], fresh)
+
+
+def list_flavors(request):
+    return _cached(request, 'flavors', lambda: [
+        FlavorRecord.from_flavor(flavor) for flavor in
+        snapshot.call(request, api.flavor.Flavor.list)
+    ])
+
+
+def invalidate(request):
+    """Drops the cached inventories, after something changed them."""
+    cache.cache.delete_many([_cache_key(request, inventory)
+                             for inventory in INVENTORIES])
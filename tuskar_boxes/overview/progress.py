@@ -0,0 +1,183 @@
+# -*- coding: utf8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Incremental node updates for the deployment progress polls.
+
+Every progress update carries a cursor identifying the node snapshot it
+was computed from. When the client sends that cursor back with the next
+poll, only the nodes that changed since then are included in the update.
+The updates also carry an ETag, so that polls of an idle deployment can
+be answered with 304 Not Modified.
+
+Instead of polling, the browsers may subscribe to a stream of server-sent
+events. All the streams of one stack share a single watcher, which loads
+the progress data at most once per interval.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from django.core import cache
+
+
+CURSOR_HEADER = 'HTTP_X_BOXES_NODES_CURSOR'
+CURSOR_CACHE_TTL = 600
+ROLE_PROGRESS_KEYS = (
+    'id',
+    'status',
+    'finished',
+    'planned_node_count',
+    'deployed_node_count',
+    'deploying_node_count',
+    'waiting_node_count',
+    'error_node_count',
+)
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True)).hexdigest()
+
+
+def _cursor_key(cursor):
+    return 'tuskar_boxes:progress:%s' % cursor
+
+
+def node_digests(nodes):
+    """Maps the node uuids to short digests of their data."""
+    return dict((node['uuid'], _digest(node)[:12]) for node in nodes)
+
+
+def snapshot_cursor(digests):
+    return _digest(sorted(digests.items()))
+
+
+def node_delta(cursor, nodes, digests=None):
+    """Returns the nodes that changed since the snapshot of the cursor.
+
+    If the snapshot is unknown or expired, all the nodes are returned,
+    and ``nodes_full`` is set to True.
+    """
+    if digests is None:
+        digests = node_digests(nodes)
+    new_cursor = snapshot_cursor(digests)
+    previous = cache.cache.get(_cursor_key(cursor)) if cursor else None
+    cache.cache.set(_cursor_key(new_cursor), digests, CURSOR_CACHE_TTL)
+    if previous is None:
+        return {
+            'nodes': nodes,
+            'nodes_removed': [],
+            'nodes_cursor': new_cursor,
+            'nodes_full': True,
+        }
+    return {
+        'nodes': [node for node in nodes
+                  if previous.get(node['uuid']) != digests[node['uuid']]],
+        'nodes_removed': [uuid for uuid in previous if uuid not in digests],
+        'nodes_cursor': new_cursor,
+        'nodes_full': False,
+    }
+
+
+def progress_etag(data, digests=None):
+    """Computes a strong ETag for the progress update of the data.
+
+    It covers the node snapshot, the stack status, the progress and role
+    counts, and the last events, so it changes whenever the update would.
+    The update itself doesn't need to be serialized for that.
+    """
+    if digests is None:
+        digests = node_digests(data.get('nodes', []))
+    stack = data.get('stack')
+    return _digest([
+        snapshot_cursor(digests),
+        getattr(stack, 'stack_status', None),
+        data.get('progress'),
+        data.get('show_last_events'),
+        [[role.get(key) for key in ROLE_PROGRESS_KEYS]
+         for role in data.get('roles', [])],
+        [[event.event_time, event.resource_name, event.resource_status,
+          event.resource_status_reason]
+         for event in data.get('last_events', [])],
+    ])
+
+
+class StackWatcher(object):
+    """Watches the deployment progress of one stack for all its streams.
+
+    The progress data is loaded by whichever stream asks for it first
+    after the interval passed, while the other streams wait for it and
+    reuse it. The version only changes when the data does.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.version = 0
+        self.data = None
+        self.etag = None
+        self.loaded = None
+        self._lock = threading.Lock()
+
+    def get(self, load):
+        """Returns the current version and data, reloading them if old."""
+        with self._lock:
+            now = time.time()
+            if self.loaded is None or now - self.loaded >= self.interval:
+                data = load()
+                etag = progress_etag(data, data.get('node_digests'))
+                if etag != self.etag:
+                    self.version += 1
+                    self.data = data
+                    self.etag = etag
+                self.loaded = now
+            return self.version, self.data
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def get_watcher(key, interval):
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = _watchers[key] = StackWatcher(interval)
+        return watcher
+
+
+def stream_events(watcher, load, build_update, interval, duration):
+    """Generates the server-sent events for one stream.
+
+    An event is sent whenever the watcher's data changes, and a comment
+    keeps the connection alive otherwise. After the duration the stream
+    ends, and the browser reconnects on its own.
+    """
+    deadline = time.time() + duration
+    version = None
+    cursor = None
+    while True:
+        new_version, data = watcher.get(load)
+        if new_version != version:
+            version = new_version
+            update = build_update(data, cursor)
+            # Updates with count tiles instead of nodes carry no cursor.
+            cursor = update.get('nodes_cursor')
+            yield 'id: %d\nevent: progress\ndata: %s\n\n' % (
+                version, json.dumps(update))
+        else:
+            yield ': keep-alive\n\n'
+        if time.time() >= deadline:
+            return
+        time.sleep(interval)
@@ -12,18 +12,43 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
+
+from django.core import cache
 from django.core import urlresolvers
+import django.forms
+from django.utils import datastructures
 import mock
 from tuskar_ui import api
 from tuskar_ui.infrastructure.overview import tests
 from tuskar_ui.test import helpers
 
+from tuskar_boxes.overview import benchmarks
+from tuskar_boxes.overview import forms
+from tuskar_boxes.overview import inventory
+from tuskar_boxes.overview import progress
+from tuskar_boxes.overview import views
+from tuskar_ui_extras import snapshot
+
 
 INDEX_URL = urlresolvers.reverse(
     'horizon:infrastructure:overview:index')
+NODES_URL = urlresolvers.reverse(
+    'horizon:infrastructure:overview:nodes')
+NODES_JSON_URL = urlresolvers.reverse(
+    'horizon:infrastructure:overview:nodes_json')
+ROLE_LOAD_URL = urlresolvers.reverse(
+    'horizon:infrastructure:overview:role_load')
+STREAM_URL = urlresolvers.reverse(
+    'horizon:infrastructure:overview:progress_stream')
 
 
 class BoxesViewsTests(helpers.BaseAdminViewTests):
+    def setUp(self):
+        super(BoxesViewsTests, self).setUp()
+        cache.cache.clear()
+        forms._parameter_fields.clear()
+
     def test_index_edit_get(self):
         with (
             tests._mock_plan()
@@ -66,12 +91,97 @@ class BoxesViewsTests(helpers.BaseAdminViewTests):
             res = self.client.post(INDEX_URL, data)
             self.assertNoFormErrors(res)
             self.assertRedirectsNoFollow(res, INDEX_URL)
-            api.tuskar.Plan.patch.assert_called_with(mock.ANY, plan.id, {
+            # The counts and the flavors are sent in a single update.
+            self.assertEqual(api.tuskar.Plan.patch.call_count, 1)
+            args, kwargs = api.tuskar.Plan.patch.call_args
+            self.assertEqual(args[:2], (mock.ANY, plan.id))
+            parameters = args[2]
+            self.assertEqual(dict(
+                (name, value) for (name, value) in parameters.items()
+                if name.endswith('::Flavor')
+            ), {
                 'Object Storage-1::Flavor': u'baremetal',
                 'Compute-1::Flavor': u'baremetal',
                 'Controller-1::Flavor': u'baremetal',
                 'Block Storage-1::Flavor': u'baremetal',
             })
+            self.assertEqual(sorted(
+                value for (name, value) in parameters.items()
+                if name.endswith('::count')
+            ), [0, 0, 0, 1])
+
+    def _count_parameters(self, counts, role_names=None):
+        roles = {}
+        form = forms.EditPlan.__new__(forms.EditPlan)
+        form.fields = {}
+        for name in ('Controller', 'Compute', 'Ceph-Storage'):
+            prefix = '%s-1::' % name
+            role = mock.Mock(node_count_parameter_name=prefix + 'count',
+                             parameter_prefix=prefix)
+            form.fields['%s-count' % name] = mock.Mock(role=role)
+            if role_names is None or name in role_names:
+                roles[name] = role
+        form.plan = mock.Mock(**{
+            'get_role_by_name.side_effect': roles.__getitem__,
+        })
+        with mock.patch('tuskar_ui.utils.utils.create_cephx_key',
+                        return_value='key'):
+            return form._count_parameters(dict(
+                ('%s-count' % name, count) for (name, count) in counts.items()
+            ))
+
+    def test_edit_plan_count_parameters_one_controller(self):
+        parameters = self._count_parameters({
+            'Controller': 1,
+            'Compute': 2,
+            'Ceph-Storage': 0,
+        })
+        self.assertEqual(parameters, {
+            'Controller-1::count': 1,
+            'Compute-1::count': 2,
+            'Ceph-Storage-1::count': 0,
+        })
+
+    def test_edit_plan_count_parameters_three_controllers(self):
+        parameters = self._count_parameters({
+            'Controller': 3,
+            'Compute': 2,
+            'Ceph-Storage': 0,
+        })
+        for name in ('Controller', 'Compute'):
+            self.assertEqual(parameters[name + '-1::NeutronL3HA'], 'True')
+            self.assertEqual(
+                parameters[name + '-1::NeutronAllowL3AgentFailover'], 'False')
+        self.assertEqual(
+            parameters['Controller-1::NeutronDhcpAgentsPerNetwork'], 3)
+        self.assertNotIn('CephMonKey', parameters)
+
+    def test_edit_plan_count_parameters_ceph(self):
+        parameters = self._count_parameters({
+            'Controller': 1,
+            'Compute': 2,
+            'Ceph-Storage': 1,
+        })
+        self.assertEqual(parameters['CephMonKey'], 'key')
+        self.assertEqual(parameters['CephAdminKey'], 'key')
+        self.assertTrue(parameters['CephClusterFSID'])
+        self.assertEqual(parameters['Controller-1::GlanceBackend'], 'rbd')
+        self.assertTrue(parameters['Controller-1::CinderEnableRbdBackend'])
+        self.assertFalse(parameters['Controller-1::CinderEnableIscsiBackend'])
+        self.assertTrue(parameters['Compute-1::NovaEnableRbdBackend'])
+        self.assertNotIn('Controller-1::NeutronL3HA', parameters)
+
+    def test_edit_plan_count_parameters_no_compute(self):
+        # Ceph doesn't depend on finding the Compute role.
+        parameters = self._count_parameters({
+            'Controller': 3,
+            'Compute': 0,
+            'Ceph-Storage': 1,
+        }, role_names=('Controller', 'Ceph-Storage'))
+        self.assertNotIn('Controller-1::NeutronL3HA', parameters)
+        self.assertEqual(parameters['CephMonKey'], 'key')
+        self.assertEqual(parameters['Controller-1::GlanceBackend'], 'rbd')
+        self.assertNotIn('Compute-1::NovaEnableRbdBackend', parameters)
 
     def test_index_live_get(self):
         stack = api.heat.Stack(tests.TEST_DATA.heatclient_stacks.first())
@@ -127,3 +237,584 @@ class BoxesViewsTests(helpers.BaseAdminViewTests):
             res, 'infrastructure/overview/deployment_progress.html')
         self.assertTemplateUsed(
             res, 'tuskar_boxes/overview/role_nodes_status.html')
+
+    def test_index_progress_update(self):
+        stack = api.heat.Stack(tests.TEST_DATA.heatclient_stacks.first())
+        event = mock.Mock(event_time='2015-01-01T00:00:00Z',
+                          resource_name='Controller',
+                          resource_status='CREATE_IN_PROGRESS',
+                          resource_status_reason='state changed')
+        node = mock.Mock(uuid='1', instance_uuid=None, state='free',
+                         cpu_arch='x86_64', cpus=1, memory_mb=4096,
+                         local_gb=40)
+
+        with (
+            tests._mock_plan()
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.get_by_plan',
+                       return_value=stack)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.is_deleting',
+                       return_value=True)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.is_deployed',
+                       return_value=False)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.resources',
+                       return_value=[])
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.events', [event])
+        ), (
+            mock.patch('tuskar_ui.api.node.Node.list', return_value=[node])
+        ), (
+            mock.patch('tuskar_ui.api.flavor.Flavor.list', return_value=[])
+        ) as flavor_list:
+            res = self.client.get(INDEX_URL,
+                                  HTTP_X_HORIZON_PROGRESS='true')
+            not_modified_res = self.client.get(
+                INDEX_URL,
+                HTTP_X_HORIZON_PROGRESS='true',
+                HTTP_IF_NONE_MATCH=res['ETag'],
+            )
+        self.assertEqual(res.status_code, 200)
+        data = json.loads(res.content)
+        self.assertEqual([node['uuid'] for node in data['nodes']], ['1'])
+        self.assertEqual(data['nodes'][0]['state_icon'], 'fa-minus')
+        self.assertFalse(flavor_list.called)
+        self.assertEqual(not_modified_res.status_code, 304)
+        self.assertEqual(not_modified_res.content, '')
+
+    def test_index_progress_state_change(self):
+        stack = api.heat.Stack(tests.TEST_DATA.heatclient_stacks.first())
+        node = mock.Mock(uuid='1', instance_uuid=None, state='free',
+                         cpu_arch='x86_64', cpus=1, memory_mb=4096,
+                         local_gb=40)
+
+        with (
+            tests._mock_plan()
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.get_by_plan',
+                       return_value=stack)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.is_deleting',
+                       return_value=True)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.is_deployed',
+                       return_value=False)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.resources',
+                       return_value=[])
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.events', [])
+        ), (
+            mock.patch('tuskar_ui.api.node.Node.list', return_value=[node])
+        ) as node_list:
+            res = self.client.get(INDEX_URL,
+                                  HTTP_X_HORIZON_PROGRESS='true')
+            node.state = api.node.PROVISIONING_STATE
+            next_res = self.client.get(
+                INDEX_URL,
+                HTTP_X_HORIZON_PROGRESS='true',
+                HTTP_IF_NONE_MATCH=res['ETag'],
+            )
+        # The cached inventory isn't used for the progress.
+        self.assertEqual(node_list.call_count, 2)
+        self.assertEqual(next_res.status_code, 200)
+        self.assertNotEqual(next_res['ETag'], res['ETag'])
+        data = json.loads(next_res.content)
+        self.assertEqual([node['state'] for node in data['nodes']],
+                         [api.node.PROVISIONING_STATE])
+
+    def test_progress_stream(self):
+        stack = api.heat.Stack(tests.TEST_DATA.heatclient_stacks.first())
+        event = mock.Mock(event_time='2015-01-01T00:00:00Z',
+                          resource_name='Controller',
+                          resource_status='CREATE_IN_PROGRESS',
+                          resource_status_reason='state changed')
+        node = mock.Mock(uuid='1', instance_uuid=None, state='free',
+                         cpu_arch='x86_64', cpus=1, memory_mb=4096,
+                         local_gb=40)
+        stream_config = {'interval': 0, 'duration': 0}
+
+        with (
+            self.settings(TUSKAR_BOXES_PROGRESS_STREAM=stream_config)
+        ), (
+            tests._mock_plan()
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.get_by_plan',
+                       return_value=stack)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.is_deploying',
+                       return_value=True)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.resources',
+                       return_value=[])
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.events', [event])
+        ), (
+            mock.patch('tuskar_ui.api.node.Node.list', return_value=[node])
+        ):
+            res = self.client.get(STREAM_URL)
+            content = ''.join(res.streaming_content)
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+        self.assertTrue(content.startswith('id: '))
+        self.assertIn('event: progress', content)
+        update = json.loads(content.split('data: ', 1)[1].split('\n')[0])
+        self.assertEqual([node['uuid'] for node in update['nodes']], ['1'])
+
+    def test_progress_stream_tiles(self):
+        stack = api.heat.Stack(tests.TEST_DATA.heatclient_stacks.first())
+        nodes = [mock.Mock(uuid=str(i), instance_uuid=None, state='free',
+                           cpu_arch='x86_64', cpus=1, memory_mb=4096,
+                           local_gb=40) for i in range(3)]
+        stream_config = {'interval': 0, 'duration': 0}
+
+        with (
+            self.settings(TUSKAR_BOXES_PROGRESS_STREAM=stream_config,
+                          TUSKAR_BOXES_AGGREGATE_THRESHOLD=2)
+        ), (
+            tests._mock_plan()
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.get_by_plan',
+                       return_value=stack)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.is_deploying',
+                       return_value=True)
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.resources',
+                       return_value=[])
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.events', [])
+        ), (
+            mock.patch('tuskar_ui.api.node.Node.list', return_value=nodes)
+        ):
+            res = self.client.get(STREAM_URL)
+            content = ''.join(res.streaming_content)
+        self.assertIn('event: progress', content)
+        update = json.loads(content.split('data: ', 1)[1].split('\n')[0])
+        self.assertNotIn('nodes', update)
+        self.assertEqual([tile['count'] for tile in update['node_tiles']],
+                         [3])
+
+    def test_progress_stream_disabled(self):
+        with self.settings(TUSKAR_BOXES_PROGRESS_STREAM=None):
+            res = self.client.get(STREAM_URL)
+        self.assertEqual(res.status_code, 404)
+
+    def test_node_roles(self):
+        roles = [api.tuskar.Role(role)
+                 for role in self.tuskarclient_roles.list()]
+        stack = mock.Mock(**{'resources.return_value': [
+            mock.Mock(physical_resource_id='instance-1', role=roles[0]),
+            mock.Mock(physical_resource_id='instance-2', role=roles[1]),
+            mock.Mock(physical_resource_id=None, role=roles[2]),
+        ]})
+
+        roles_by_node = views.node_roles(None, stack)
+        self.assertEqual(roles_by_node, {
+            'instance-1': roles[0],
+            'instance-2': roles[1],
+        })
+        stack.resources.assert_called_once_with(with_joins=False)
+        self.assertEqual(views.node_roles(None, None), {})
+
+    def test_node_index(self):
+        nodes = [
+            mock.Mock(uuid='1', cpus=1, memory_mb=4096, local_gb=40,
+                      cpu_arch='x86_64'),
+            mock.Mock(uuid='2', cpus='2', memory_mb=8192, local_gb=40,
+                      cpu_arch='x86_64'),
+            mock.Mock(uuid='3', cpus=1, memory_mb='4096', local_gb=40,
+                      cpu_arch='x86_64'),
+            mock.Mock(uuid='4', cpus=None, memory_mb=None, local_gb=None,
+                      cpu_arch=None),
+        ]
+        flavor = mock.Mock(vcpus=1, ram=4096, disk=40, cpu_arch='x86_64')
+        node_index = views.NodeIndex(nodes)
+
+        self.assertEqual(
+            [node.uuid for node in node_index.flavor_nodes(flavor)],
+            ['1', '3'])
+        self.assertEqual(
+            [node.uuid for node in node_index.flavor_nodes(flavor, False)],
+            ['1', '2', '3'])
+
+    def test_match_flavors(self):
+        archs = ['x86_64', 'i386', None]
+        nodes = [mock.Mock(uuid=str(i), cpus=1 + i % 4,
+                           memory_mb=1024 * (1 + i % 5), local_gb=20 * (i % 3),
+                           cpu_arch=archs[i % 3])
+                 for i in range(300)]
+        flavors = [mock.Mock(vcpus=1 + i % 3, ram=1024 * (1 + i % 4),
+                             disk=20 * (i % 2), cpu_arch=archs[i % 2])
+                   for i in range(12)]
+        node_index = views.NodeIndex(nodes)
+
+        for exact_match in (True, False):
+            expected = [node_index.flavor_nodes(flavor, exact_match)
+                        for flavor in flavors]
+            self.assertEqual(
+                node_index.match_flavors(flavors, exact_match), expected)
+            with mock.patch.object(views, 'numpy', None):
+                self.assertEqual(
+                    node_index.match_flavors(flavors, exact_match), expected)
+        self.assertEqual(views.NodeIndex([]).match_flavors(flavors, False),
+                         [[]] * len(flavors))
+
+    def test_no_flavor_nodes(self):
+        nodes = [{'uuid': str(i)} for i in range(2000)]
+        flavor_data = [{
+            'node_uuids': set(node['uuid'] for node in nodes[i:i + 10]),
+        } for i in range(0, 1000, 20)]
+
+        no_flavor_nodes = views._no_flavor_nodes(nodes, flavor_data)
+        self.assertEqual(len(no_flavor_nodes), 1500)
+        self.assertEqual(no_flavor_nodes[0]['uuid'], '10')
+        self.assertEqual(no_flavor_nodes[-1]['uuid'], '1999')
+
+    def test_node_details(self):
+        nodes = [{
+            'uuid': 'node-%d' % i,
+            'cpu_arch': '</script>',
+            'cpus': i,
+            'memory_mb': 4096,
+            'local_gb': 40,
+            'state': 'free',
+        } for i in range(3)]
+
+        serialized = views.node_details(nodes)
+        self.assertNotIn('<', serialized)
+        columns = json.loads(serialized)
+        self.assertEqual(sorted(columns), sorted(views.NODE_DETAILS))
+        self.assertEqual(columns['uuid'], ['node-0', 'node-1', 'node-2'])
+        self.assertEqual(columns['cpus'], [0, 1, 2])
+        self.assertEqual(columns['cpu_arch'][0], '</script>')
+
+    def test_node_tiles(self):
+        nodes = [{
+            'uuid': str(i),
+            'role_name': 'Compute' if i % 2 else '',
+            'role_slug': 'compute' if i % 2 else '',
+            'node_title': 'Compute node' if i % 2 else 'Free node',
+            'state': 'active' if i % 3 else 'free',
+            'state_slug': 'active' if i % 3 else 'free',
+            'state_icon': 'fa-check',
+        } for i in range(12)]
+
+        tiles = views.node_tiles(nodes)
+        self.assertEqual(
+            [(tile['role_slug'], tile['state_slug'], tile['count'])
+             for tile in tiles],
+            [('', 'free', 2), ('compute', 'active', 4), ('', 'active', 4),
+             ('compute', 'free', 2)])
+        self.assertTrue(tiles[1]['url'].startswith(NODES_URL + '?'))
+        self.assertIn('role=compute', tiles[1]['url'])
+        self.assertIn('state=active', tiles[1]['url'])
+
+        self.assertEqual(
+            len(views.filter_nodes(nodes, role='compute', state='active')),
+            4)
+        self.assertEqual(len(views.filter_nodes(nodes, state='free')), 4)
+        with self.settings(TUSKAR_BOXES_AGGREGATE_THRESHOLD=12):
+            self.assertTrue(views.is_aggregated(nodes))
+            self.assertFalse(views.is_aggregated(nodes[1:]))
+
+    def test_node_list(self):
+        nodes = [mock.Mock(uuid=str(i), instance_uuid=None, state='free',
+                           cpu_arch='x86_64', cpus=1, memory_mb=4096,
+                           local_gb=40)
+                 for i in range(150)]
+        with (
+            tests._mock_plan()
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.get_by_plan',
+                       return_value=None)
+        ), (
+            mock.patch('tuskar_ui.api.node.Node.list', return_value=nodes)
+        ):
+            res = self.client.get(NODES_URL + '?role=&page=2')
+            missing = self.client.get(NODES_URL + '?page=3')
+        self.assertTemplateUsed(res, 'tuskar_boxes/overview/node_list.html')
+        self.assertEqual(len(res.context['nodes']), 50)
+        self.assertIn('previous_url', res.context)
+        self.assertNotIn('next_url', res.context)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_node_inventory(self):
+        nodes = [mock.Mock(uuid='%03d' % i, instance_uuid=None,
+                           state='free' if i % 2 else 'active',
+                           cpu_arch='x86_64', cpus=1 + i % 3,
+                           memory_mb=4096, local_gb=40)
+                 for i in reversed(range(25))]
+        flavor = mock.Mock(vcpus=2, ram=4096, disk=40, cpu_arch='x86_64')
+        flavor.name = 'two-cpus'
+
+        def get(query):
+            res = self.client.get(NODES_JSON_URL + query)
+            self.assertEqual(res['Content-Type'], 'application/json')
+            return json.loads(''.join(res.streaming_content))
+
+        with (
+            tests._mock_plan()
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.get_by_plan',
+                       return_value=None)
+        ), (
+            mock.patch('tuskar_ui.api.node.Node.list', return_value=nodes)
+        ), (
+            mock.patch('tuskar_ui.api.flavor.Flavor.list',
+                       return_value=[flavor])
+        ), (
+            mock.patch.object(views, 'MATCHING_DEPLOYMENT_MODE', True)
+        ):
+            first = get('?limit=10')
+            second = get('?limit=10&cursor=' + first['next_cursor'])
+            last = get('?limit=10&cursor=' + second['next_cursor'])
+            free = get('?state=free')
+            two_cpus = get('?flavor=two-cpus')
+            unknown = get('?flavor=unknown')
+            bad = self.client.get(NODES_JSON_URL + '?limit=many')
+
+        self.assertEqual([node['uuid'] for node in first['nodes']],
+                         ['%03d' % i for i in range(10)])
+        self.assertEqual(second['nodes'][0]['uuid'], '010')
+        self.assertEqual(len(last['nodes']), 5)
+        self.assertIsNone(last['next_cursor'])
+        self.assertEqual(len(free['nodes']), 12)
+        self.assertTrue(all(node['state'] == 'free'
+                            for node in free['nodes']))
+        self.assertEqual(len(two_cpus['nodes']), 8)
+        self.assertEqual(unknown['nodes'], [])
+        self.assertEqual(bad.status_code, 400)
+
+    def test_downsample(self):
+        points = [{'x': str(i), 'y': float(i)} for i in range(100)]
+
+        self.assertEqual(views.downsample(points[:10], 50), points[:10])
+        sampled = views.downsample(points, 10)
+        self.assertEqual(len(sampled), 10)
+        self.assertEqual(sampled[0], {'x': '9', 'y': 4.5})
+        self.assertEqual(sampled[-1], {'x': '99', 'y': 94.5})
+
+    def test_role_load(self):
+        roles = [api.tuskar.Role(role)
+                 for role in self.tuskarclient_roles.list()[:2]]
+        stack = mock.Mock(id='stack', **{'resources.return_value': [
+            mock.Mock(physical_resource_id='instance-1', role=roles[0]),
+            mock.Mock(physical_resource_id='instance-2', role=roles[0]),
+            mock.Mock(physical_resource_id='instance-3', role=roles[1]),
+        ]})
+
+        def resource(resource_id, *values):
+            return mock.Mock(resource_id=resource_id, **{
+                'get_meter.return_value': [
+                    mock.Mock(duration_end='2014-10-01T10:0%d:00' % i,
+                              avg=value)
+                    for i, value in enumerate(values)
+                ],
+            })
+
+        # The samples are keyed by the instance uuid or by the address.
+        resources = dict((item.resource_id, item) for item in [
+            resource('instance-1', 1.0, 2.0),
+            resource('192.0.2.2', 3.0, 4.0),
+            resource('192.0.2.3', 5.0, 6.0),
+            resource('unrelated', 100.0, 100.0),
+        ])
+
+        def query_resources(request, date_from, date_to, group_by, meter,
+                            query):
+            [condition] = query
+            self.assertEqual(condition['field'], 'resource_id')
+            self.assertEqual(condition['op'], 'eq')
+            found = resources.get(condition['value'])
+            return [found] if found else []
+
+        servers = [
+            mock.Mock(id='instance-2', addresses={
+                'ctlplane': [{'addr': '192.0.2.2', 'version': 4}],
+            }),
+            mock.Mock(id='instance-3', addresses={
+                'ctlplane': [{'addr': '192.0.2.3', 'version': 4}],
+            }),
+            mock.Mock(id='unrelated', addresses={
+                'ctlplane': [{'addr': '192.0.2.4', 'version': 4}],
+            }),
+        ]
+        with (
+            mock.patch('tuskar_ui.utils.metering.get_meter_list_and_unit',
+                       return_value=([], ''))
+        ), (
+            mock.patch('openstack_dashboard.api.nova.server_list',
+                       return_value=(servers, False))
+        ), (
+            mock.patch('tuskar_ui.utils.metering.query_data',
+                       side_effect=query_resources)
+        ) as query_data, (
+            tests._mock_plan()
+        ), (
+            mock.patch('tuskar_ui.api.heat.Stack.get_by_plan',
+                       return_value=stack)
+        ):
+            res = self.client.get(ROLE_LOAD_URL)
+            single = self.client.get(
+                ROLE_LOAD_URL + '?role=' + roles[0].id)
+
+        # Only the three instances and their two addresses are queried,
+        # and only once for both requests.
+        self.assertEqual(
+            sorted(call[1]['query'][0]['value']
+                   for call in query_data.call_args_list),
+            ['192.0.2.2', '192.0.2.3', 'instance-1', 'instance-2',
+             'instance-3'])
+        graphs = json.loads(res.content)['roles']
+        self.assertEqual(sorted(graphs), sorted(role.id for role in roles))
+        series = graphs[roles[0].id]['series']
+        self.assertEqual(len(series), 1)
+        self.assertEqual([point['y'] for point in series[0]['data']],
+                         [2.0, 3.0])
+        self.assertEqual(
+            [point['y'] for point in graphs[roles[1].id]['series'][0]['data']],
+            [5.0, 6.0])
+        self.assertEqual(json.loads(single.content),
+                         graphs[roles[0].id])
+
+    def test_role_load_locked(self):
+        stack = mock.Mock(id='locked-stack')
+        request = mock.Mock(user=mock.Mock(tenant_id='tenant'))
+        key = 'tuskar_boxes:role_load:tenant:locked-stack:%s' % (
+            views.ROLE_LOAD_DATE_OPTIONS)
+        cache.cache.add(key + ':lock', True)
+        try:
+            with (
+                mock.patch('tuskar_boxes.overview.views.role_load')
+            ) as role_load, (
+                mock.patch('tuskar_boxes.overview.views.ROLE_LOAD_LOCK_WAIT',
+                           0)
+            ):
+                # Another request is building the graphs.
+                self.assertEqual(views.cached_role_load(request, stack), {})
+                cache.cache.set(key, {'role': 'graph'})
+                self.assertEqual(views.cached_role_load(request, stack),
+                                 {'role': 'graph'})
+        finally:
+            cache.cache.delete(key + ':lock')
+            cache.cache.delete(key)
+        self.assertFalse(role_load.called)
+
+    def test_global_parameter_fields(self):
+        plan = mock.Mock(uuid='plan-1', parameters=[
+            {'name': 'AdminPassword', 'value': 'secret', 'hidden': True},
+            {'name': 'Compute-1::count', 'value': 1, 'hidden': False},
+        ])
+
+        def parameter_fields(request):
+            return datastructures.SortedDict(
+                (parameter['name'], django.forms.CharField(
+                    initial=parameter['value']))
+                for parameter in plan.parameters
+            )
+
+        with mock.patch('tuskar_ui.infrastructure.parameters.forms.'
+                        'parameter_fields',
+                        side_effect=parameter_fields) as build:
+            fields = forms.global_parameter_fields(self.request, plan)
+            self.assertEqual(fields.keys(), ['AdminPassword'])
+            self.assertEqual(fields['AdminPassword'].initial, 'secret')
+
+            # Only the values changed, the fields are not built again.
+            plan.parameters[0]['value'] = 'changed'
+            fields = forms.global_parameter_fields(self.request, plan)
+            self.assertEqual(fields['AdminPassword'].initial, 'changed')
+            self.assertEqual(build.call_count, 1)
+
+            plan.parameters[0]['hidden'] = False
+            forms.global_parameter_fields(self.request, plan)
+            self.assertEqual(build.call_count, 2)
+
+            forms.invalidate_parameter_fields(plan)
+            forms.global_parameter_fields(self.request, plan)
+            self.assertEqual(build.call_count, 3)
+
+    def test_inventory_cache(self):
+        node = mock.Mock(uuid='1', instance_uuid=None, state='free',
+                         cpu_arch='x86_64', cpus=1, memory_mb=4096,
+                         local_gb=40)
+        with mock.patch('tuskar_ui.api.node.Node.list',
+                        return_value=[node]) as node_list:
+            nodes = inventory.list_nodes(self.request)
+            snapshot.invalidate(self.request)
+            self.assertEqual(inventory.list_nodes(self.request), nodes)
+            self.assertEqual(node_list.call_count, 1)
+            self.assertEqual(nodes[0].uuid, '1')
+
+            inventory.invalidate(self.request)
+            snapshot.invalidate(self.request)
+            inventory.list_nodes(self.request)
+            self.assertEqual(node_list.call_count, 2)
+
+            with self.settings(TUSKAR_BOXES_INVENTORY_CACHE_TTL=0):
+                snapshot.invalidate(self.request)
+                inventory.list_nodes(self.request)
+                self.assertEqual(node_list.call_count, 3)
+
+            # A fresh listing refreshes the cache.
+            node.state = 'provisioning'
+            snapshot.invalidate(self.request)
+            inventory.list_nodes(self.request, fresh=True)
+            self.assertEqual(node_list.call_count, 4)
+            snapshot.invalidate(self.request)
+            self.assertEqual(inventory.list_nodes(self.request)[0].state,
+                             'provisioning')
+            self.assertEqual(node_list.call_count, 4)
+
+    def test_inventory_cache_empty(self):
+        inventory.invalidate(self.request)
+        with mock.patch('tuskar_ui.api.node.Node.list',
+                        return_value=[]) as node_list:
+            self.assertEqual(inventory.list_nodes(self.request), [])
+            snapshot.invalidate(self.request)
+            self.assertEqual(inventory.list_nodes(self.request), [])
+            # An empty, possibly failed, listing isn't cached.
+            self.assertEqual(node_list.call_count, 2)
+
+    def test_node_delta(self):
+        nodes = [{'uuid': '1', 'state': 'free'},
+                 {'uuid': '2', 'state': 'free'},
+                 {'uuid': '3', 'state': 'free'}]
+
+        full = progress.node_delta(None, nodes)
+        self.assertTrue(full['nodes_full'])
+        self.assertEqual(full['nodes'], nodes)
+
+        changed = [{'uuid': '1', 'state': 'free'},
+                   {'uuid': '2', 'state': 'provisioning'}]
+        delta = progress.node_delta(full['nodes_cursor'], changed)
+        self.assertFalse(delta['nodes_full'])
+        self.assertEqual(delta['nodes'], [changed[1]])
+        self.assertEqual(delta['nodes_removed'], ['3'])
+        self.assertNotEqual(delta['nodes_cursor'], full['nodes_cursor'])
+
+        same = progress.node_delta(delta['nodes_cursor'], changed)
+        self.assertEqual(same['nodes'], [])
+        self.assertEqual(same['nodes_cursor'], delta['nodes_cursor'])
+
+        unknown = progress.node_delta('expired', changed)
+        self.assertTrue(unknown['nodes_full'])
+
+    def test_scaling_violations(self):
+        results = [
+            {'mode': 'edit', 'nodes': 100, 'total': 0.5},
+            {'mode': 'edit', 'nodes': 1000, 'total': 2.0},
+            {'mode': 'edit', 'nodes': 10000, 'total': 25.0},
+            {'mode': 'progress', 'nodes': 1000, 'total': 1.0},
+            {'mode': 'progress', 'nodes': 10000, 'total': 100.0},
+        ]
+        violations = benchmarks.scaling_violations(results, 2.0)
+        self.assertEqual([violation[:3] for violation in violations],
+                         [('progress', 1000, 10000)])
+        self.assertAlmostEqual(violations[0][3], 10.0)
+        self.assertEqual(
+            [violation[:3] for violation
+             in benchmarks.scaling_violations(results, 1.1)],
+            [('edit', 1000, 10000), ('progress', 1000, 10000)])
@@ -26,6 +26,15 @@ urlpatterns.extend(urls.patterns(
     urls.url(r'^$', views.IndexView.as_view(), name='index'),
     urls.url(r'^config$', views.GlobalServiceConfigView.as_view(),
              name='config'),
+    urls.url(r'^register$', views.RegisterView.as_view(),
+             name='register'),
+    urls.url(r'^nodes$', views.NodeListView.as_view(), name='nodes'),
+    urls.url(r'^nodes\.json$', views.NodeInventoryView.as_view(),
+             name='nodes_json'),
+    urls.url(r'^role-load\.json$', views.RoleLoadView.as_view(),
+             name='role_load'),
+    urls.url(r'^progress-stream$', views.ProgressStreamView.as_view(),
+             name='progress_stream'),
 ))
 
 if settings.DEBUG:
@@ -12,24 +12,69 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
 import collections
-import operator
+import copy
+import json
+import logging
+import time
 
+from django.conf import settings
+from django.core import cache as django_cache
+from django.core import paginator
 from django.core.urlresolvers import reverse
+from django.core.urlresolvers import reverse_lazy
+from django import http
+from django.utils import cache
+import django.utils.http
+from django.utils import safestring
 import django.utils.text
 from django.utils.translation import ugettext_lazy as _
+from django.views import generic
 import horizon.forms
 from openstack_dashboard.api import base as api_base
+from openstack_dashboard.api import nova
+from openstack_dashboard.utils import metering as dashboard_metering
 
 from tuskar_ui import api
 from tuskar_ui.infrastructure.flavors import utils
+from tuskar_ui.infrastructure.nodes import views as nodes_views
 from tuskar_ui.infrastructure.overview import views
+from tuskar_ui.infrastructure import views as infrastructure_views
 from tuskar_ui.utils import metering
 
 from tuskar_boxes.overview import forms
+from tuskar_boxes.overview import inventory
+from tuskar_boxes.overview import progress
+from tuskar_ui_extras import fanout
+from tuskar_ui_extras import snapshot
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
+
+LOG = logging.getLogger(__name__)
 MATCHING_DEPLOYMENT_MODE = utils.matching_deployment_mode()
+PROGRESS_BUDGET = 'TUSKAR_BOXES_PROGRESS_BUDGET'
+DEFAULT_PROGRESS_BUDGET = 1.0
+PROGRESS_STREAM = 'TUSKAR_BOXES_PROGRESS_STREAM'
+DEFAULT_STREAM_INTERVAL = 10
+DEFAULT_STREAM_DURATION = 300
+AGGREGATE_THRESHOLD = 'TUSKAR_BOXES_AGGREGATE_THRESHOLD'
+DEFAULT_AGGREGATE_THRESHOLD = 1000
+NODE_LIST_PAGE_SIZE = 100
+NODE_INVENTORY_LIMIT = 500
+NODE_INVENTORY_MAX_LIMIT = 5000
+ROLE_LOAD_METER = 'hardware.cpu.load.1min'
+ROLE_LOAD_DATE_OPTIONS = '0.041666'
+ROLE_LOAD_POINTS = 50
+ROLE_LOAD_CACHE_TTL = 60
+ROLE_LOAD_LOCK_TTL = 120
+ROLE_LOAD_LOCK_WAIT = 30
+ROLE_LOAD_LOCK_POLL = 0.2
+PREFETCH_TIMEOUT = 5
 NODE_STATE_ICON = {
     api.node.DISCOVERING_STATE: 'fa-search',
     api.node.DISCOVERED_STATE: 'fa-search-plus',
@@ -42,40 +87,111 @@ NODE_STATE_ICON = {
     api.node.PROVISIONING_FAILED_STATE: 'fa-exclamation-circle',
     None: 'fa-question',
 }
+NODE_DETAILS = ('uuid', 'cpu_arch', 'cpus', 'memory_mb', 'local_gb')
+
 
+def _profile(cpus, memory_mb, local_gb, cpu_arch):
+    return (int(cpus or 0), int(memory_mb or 0), int(local_gb or 0), cpu_arch)
 
-def flavor_nodes(request, flavor, exact_match=True):
-    """Lists all nodes that match the given flavor.
 
-       If exact_match is True, only nodes that match exactly will be listed.
-       Otherwise, all nodes that have at least the required resources will
-       be listed.
+class NodeIndex(object):
+    """Indexes the nodes by their hardware profile.
+
+       The nodes are listed once per request, and grouped by their
+       (cpus, memory_mb, local_gb, cpu_arch) profile. For the inexact
+       match, the distinct profiles are additionally kept sorted by the
+       number of cpus, so that only the profiles with enough cpus need to
+       be compared with the flavor.
     """
-    if exact_match:
-        matches = operator.eq
-    else:
-        matches = operator.ge
-    for node in api.node.Node.list(request, maintenance=False):
-        if all(matches(*pair) for pair in (
-            (int(node.cpus or 0), int(flavor.vcpus or 0)),
-            (int(node.memory_mb or 0), int(flavor.ram or 0)),
-            (int(node.local_gb or 0), int(flavor.disk or 0)),
-            (node.cpu_arch, flavor.cpu_arch),
-        )):
-            yield node
 
+    def __init__(self, nodes):
+        self.nodes = list(nodes)
+        self._profiles = {}
+        for position, node in enumerate(self.nodes):
+            profile = _profile(node.cpus, node.memory_mb, node.local_gb,
+                               node.cpu_arch)
+            self._profiles.setdefault(profile, []).append((position, node))
+        self._sorted_profiles = sorted(self._profiles)
+        self._sorted_cpus = [profile[0] for profile in self._sorted_profiles]
 
-def node_role(request, node):
-    try:
-        resource = api.heat.Resource.get_by_node(request, node)
-    except LookupError:
-        return None
-    return resource.role
+    def flavor_nodes(self, flavor, exact_match=True):
+        """Lists all nodes that match the given flavor.
+
+           If exact_match is True, only nodes that match exactly will be
+           listed. Otherwise, all nodes that have at least the required
+           resources will be listed. The nodes are listed in their
+           original order.
+        """
+        wanted = _profile(flavor.vcpus, flavor.ram, flavor.disk,
+                          flavor.cpu_arch)
+        if exact_match:
+            return [node for (position, node)
+                    in self._profiles.get(wanted, [])]
+        start = bisect.bisect_left(self._sorted_cpus, wanted[0])
+        found = []
+        for profile in self._sorted_profiles[start:]:
+            if all(have >= need for (have, need)
+                   in zip(profile[1:], wanted[1:])):
+                found.extend(self._profiles[profile])
+        found.sort(key=lambda item: item[0])
+        return [node for (position, node) in found]
+
+    def match_flavors(self, flavors, exact_match=True):
+        """Lists the matching nodes of every flavor, in the flavors' order.
 
+           The exact match is a lookup by profile. For the inexact one, if
+           NumPy is installed, the distinct profiles are compared with all
+           the flavors at once, building a profile by flavor match matrix
+           one column of the profiles at a time.
+        """
+        flavors = list(flavors)
+        if exact_match or numpy is None or not self._sorted_profiles:
+            return [self.flavor_nodes(flavor, exact_match)
+                    for flavor in flavors]
+        wanted = [_profile(flavor.vcpus, flavor.ram, flavor.disk,
+                           flavor.cpu_arch) for flavor in flavors]
+        # The architectures are encoded by their sort order, so that they
+        # compare the same way as the strings do.
+        archs = sorted(set(profile[3] for profile in self._sorted_profiles) |
+                       set(profile[3] for profile in wanted))
+        codes = dict((arch, code) for (code, arch) in enumerate(archs))
+        have = numpy.array([profile[:3] + (codes[profile[3]],)
+                            for profile in self._sorted_profiles],
+                           dtype=numpy.int64)
+        need = numpy.array([profile[:3] + (codes[profile[3]],)
+                            for profile in wanted], dtype=numpy.int64)
+        matrix = numpy.ones((len(have), len(need)), dtype=bool)
+        for column in range(have.shape[1]):
+            matrix &= have[:, column, None] >= need[None, :, column]
 
-def _node_data(request, nodes):
+        matched = []
+        for flavor_matches in matrix.T:
+            found = []
+            for index in numpy.flatnonzero(flavor_matches):
+                found.extend(self._profiles[self._sorted_profiles[index]])
+            found.sort(key=lambda item: item[0])
+            matched.append([node for (position, node) in found])
+        return matched
+
+
+def node_roles(request, stack):
+    """Maps the instance uuids of the stack's nodes to their roles.
+
+       The resources of the stack are fetched from Heat only once, instead
+       of looking up the resource of every node separately.
+    """
+    if not stack:
+        return {}
+    return dict(
+        (resource.physical_resource_id, resource.role)
+        for resource in stack.resources(with_joins=False)
+        if resource.physical_resource_id
+    )
+
+
+def _node_data(request, nodes, roles):
     for node in nodes:
-        role = node_role(request, node)
+        role = roles.get(node.instance_uuid)
         yield {
             'uuid': node.uuid,
             'role_name': role.name if role else '',
@@ -93,11 +209,204 @@ def _node_data(request, nodes):
         }
 
 
-def _flavor_data(request, flavors, flavor_roles):
-    for flavor in flavors:
-        nodes = list(_node_data(request,
-                                flavor_nodes(request, flavor,
-                                             MATCHING_DEPLOYMENT_MODE)))
+def _sorted_node_data(request, nodes, roles_by_node):
+    nodes = list(_node_data(request, nodes, roles_by_node))
+    nodes.sort(key=lambda node: node.get('role_name'))
+    nodes.reverse()
+    return nodes
+
+
+def node_details(nodes):
+    """Serializes the popover details of the nodes as JSON columns.
+
+       The details are shipped once per page, as one list per field, and
+       the popovers are built from them in the browser on hover. The
+       result is safe to include in a script element.
+    """
+    columns = dict((field, [node[field] for node in nodes])
+                   for field in NODE_DETAILS)
+    serialized = json.dumps(columns, separators=(',', ':'))
+    for char, escaped in (('<', '\\u003c'), ('>', '\\u003e'),
+                          ('&', '\\u0026')):
+        serialized = serialized.replace(char, escaped)
+    return safestring.mark_safe(serialized)
+
+
+def is_aggregated(nodes):
+    """Tells whether the nodes are shown as count tiles."""
+    threshold = getattr(settings, AGGREGATE_THRESHOLD,
+                        DEFAULT_AGGREGATE_THRESHOLD)
+    return bool(threshold) and len(nodes) >= threshold
+
+
+def node_tiles(nodes):
+    """Counts the nodes per role and state.
+
+       The tiles are listed in the order in which their first node
+       appears, and link to the list of the nodes they count.
+    """
+    tiles = collections.OrderedDict()
+    for node in nodes:
+        key = (node['role_slug'], node['state_slug'])
+        tile = tiles.get(key)
+        if tile is None:
+            tile = tiles[key] = {
+                'role_name': node['role_name'],
+                'role_slug': node['role_slug'],
+                'node_title': node['node_title'],
+                'state': node['state'],
+                'state_slug': node['state_slug'],
+                'state_icon': node['state_icon'],
+                'url': '%s?%s' % (
+                    reverse('horizon:infrastructure:overview:nodes'),
+                    django.utils.http.urlencode({
+                        'role': node['role_slug'],
+                        'state': node['state_slug'],
+                    }),
+                ),
+                'count': 0,
+            }
+        tile['count'] += 1
+    return list(tiles.values())
+
+
+def filter_nodes(nodes, role=None, state=None):
+    """Lists the nodes with the given role and state slugs.
+
+       A filter that is None matches all nodes.
+    """
+    return list(_iter_filtered(nodes, role, state))
+
+
+def _iter_filtered(nodes, role=None, state=None):
+    for node in nodes:
+        if ((role is None or node['role_slug'] == role) and
+                (state is None or node['state_slug'] == state)):
+            yield node
+
+
+def _stream_nodes(nodes, limit):
+    """Serializes up to limit nodes into a JSON object, piece by piece.
+
+       The object also carries the cursor of the next page, or null if
+       there are no more nodes.
+    """
+    yield '{"nodes":['
+    last = None
+    for position, node in enumerate(nodes):
+        if position == limit:
+            yield '],"next_cursor":%s}' % json.dumps(last)
+            return
+        if position:
+            yield ','
+        yield json.dumps(node)
+        last = node['uuid']
+    yield '],"next_cursor":null}'
+
+
+def downsample(points, size):
+    """Averages consecutive points, so that at most size of them remain."""
+    if len(points) <= size:
+        return points
+    step = float(len(points)) / size
+    buckets = []
+    for i in range(size):
+        chunk = points[int(i * step):int((i + 1) * step)]
+        buckets.append({
+            'x': chunk[-1]['x'],
+            'y': sum(point['y'] for point in chunk) / len(chunk),
+        })
+    return buckets
+
+
+def metering_roles(request, roles_by_node):
+    """Maps the metering resource ids of the stack's nodes to their roles.
+
+       Depending on how the hardware meters were discovered, their samples
+       are keyed either by the uuid of the node's instance or by its
+       address, so both are mapped. The addresses of all the instances are
+       listed from Nova at once.
+    """
+    resource_roles = dict(roles_by_node)
+    if not roles_by_node:
+        return resource_roles
+    try:
+        servers = snapshot.call(request, nova.server_list)[0]
+    except Exception:
+        LOG.warning("Could not list the instance addresses.", exc_info=True)
+        return resource_roles
+    for server in servers:
+        role = roles_by_node.get(server.id)
+        if role is None:
+            continue
+        for addresses in (getattr(server, 'addresses', None) or {}).values():
+            for address in addresses:
+                if address.get('addr'):
+                    resource_roles[address['addr']] = role
+    return resource_roles
+
+
+def _stack_resources(request, resource_ids, date_from, date_to):
+    # Only the resources of the stack's nodes are queried, instead of
+    # every resource of the cloud.
+    for resource_id in sorted(resource_ids):
+        query = [{'field': 'resource_id', 'op': 'eq', 'value': resource_id}]
+        for resource in metering.query_data(request, date_from, date_to,
+                                            None, ROLE_LOAD_METER,
+                                            query=query):
+            yield resource
+
+
+def role_load(request, stack, date_options=ROLE_LOAD_DATE_OPTIONS):
+    """Builds the load graphs of all the roles of the stack at once.
+
+       The statistics of the stack's nodes are averaged per role and
+       downsampled to ROLE_LOAD_POINTS points. Returns the graph data of
+       every role, keyed by the role id.
+    """
+    roles_by_node = node_roles(request, stack)
+    resource_roles = metering_roles(request, roles_by_node)
+    meter_list, unit = metering.get_meter_list_and_unit(
+        request, ROLE_LOAD_METER)
+    date_from, date_to = dashboard_metering.calc_date_args(
+        None, None, date_options)
+    meter_name = metering.get_meter_name(ROLE_LOAD_METER)
+    totals = {}
+    for resource in _stack_resources(request, resource_roles, date_from,
+                                     date_to):
+        role = resource_roles.get(getattr(resource, 'resource_id', None))
+        if role is None:
+            continue
+        role_totals = totals.setdefault(role.id, {})
+        for statistic in resource.get_meter(meter_name):
+            date = statistic.duration_end[:19]
+            total = role_totals.setdefault(date, [0.0, 0])
+            total[0] += float(statistic.avg)
+            total[1] += 1
+
+    roles = dict((role.id, role) for role in roles_by_node.values())
+    graphs = {}
+    for role_id, role in roles.items():
+        points = [{'x': date, 'y': value / count} for (date, (value, count))
+                  in sorted(totals.get(role_id, {}).items())]
+        series = []
+        if points:
+            series = dashboard_metering.normalize_series_by_unit([{
+                'unit': unit,
+                'name': role.name,
+                'meter': ROLE_LOAD_METER,
+                'data': downsample(points, ROLE_LOAD_POINTS),
+            }])
+        graphs[role_id] = metering.create_json_output(
+            series, False, unit, date_from, date_to)
+    return graphs
+
+
+def _flavor_data(request, flavors, flavor_roles, node_index, roles_by_node):
+    flavors = list(flavors)
+    matched = node_index.match_flavors(flavors, MATCHING_DEPLOYMENT_MODE)
+    for flavor, flavor_nodes in zip(flavors, matched):
+        nodes = list(_node_data(request, flavor_nodes, roles_by_node))
         roles = flavor_roles.get(flavor.name, [])
         if nodes or roles:
             # Don't list empty flavors
@@ -108,26 +417,62 @@ def _flavor_data(request, flavors, flavor_roles):
                 'disk': flavor.disk,
                 'cpu_arch': flavor.cpu_arch,
                 'nodes': nodes,
+                'node_uuids': set(node['uuid'] for node in nodes),
                 'roles': roles,
             }
 
 
-class IndexView(views.IndexView):
+def _no_flavor_nodes(nodes, flavor_data):
+    """Lists the nodes that don't match any of the listed flavors."""
+    flavor_uuids = set()
+    for flavor in flavor_data:
+        flavor_uuids.update(flavor['node_uuids'])
+    return [node for node in nodes if node['uuid'] not in flavor_uuids]
+
+
+class IndexView(snapshot.SnapshotMixin, views.IndexView):
     template_name = "tuskar_boxes/overview/index.html"
     form_class = forms.EditPlan
 
+    def prefetch(self, request, flavors=True, fresh_nodes=False):
+        """Asks the independent backends for their data concurrently.
+
+           The results are remembered by the request snapshot and the
+           memoized methods, where get_data then finds them. A call that
+           failed is simply made again later, and its error handled there.
+           Each call is given up on after PREFETCH_TIMEOUT seconds, so a
+           hung backend doesn't cost much more than the call made again.
+        """
+        def load_stack():
+            stack = self.get_stack()
+            if stack:
+                stack.resources(with_joins=False)
+            return stack
+
+        calls = {
+            'stack': load_stack,
+            'nodes': lambda: inventory.list_nodes(request,
+                                                  fresh=fresh_nodes),
+        }
+        if flavors:
+            calls['flavors'] = lambda: inventory.list_flavors(request)
+        fanout.fan_out(calls, timeout=PREFETCH_TIMEOUT)
+
     def get_data(self, request, context, *args, **kwargs):
+        self.prefetch(request)
         data = super(IndexView, self).get_data(request, context,
                                                *args, **kwargs)
-        nodes = list(_node_data(
-            request, api.node.Node.list(request, maintenance=False),
-        ))
-        nodes.sort(key=lambda node: node.get('role_name'))
-        nodes.reverse()
+        node_index = NodeIndex(inventory.list_nodes(request))
+        roles_by_node = node_roles(request, data['stack'])
+        nodes = _sorted_node_data(request, node_index.nodes, roles_by_node)
         data['nodes'] = nodes
+        if data['stack'] and is_aggregated(nodes):
+            data['node_tiles'] = node_tiles(nodes)
+        else:
+            data['node_details'] = node_details(nodes)
 
         if not data['stack']:
-            flavors = api.flavor.Flavor.list(self.request)
+            flavors = list(inventory.list_flavors(self.request))
             if not MATCHING_DEPLOYMENT_MODE:
                 # In the POC mode, only one flavor is allowed.
                 flavors = flavors[:1]
@@ -153,12 +498,10 @@ class IndexView(views.IndexView):
                     'role'].is_valid_for_deployment(data['plan'])
             data['free_roles'] = free_roles
             flavor_data = list(
-                _flavor_data(self.request, flavors, flavor_roles))
+                _flavor_data(self.request, flavors, flavor_roles,
+                             node_index, roles_by_node))
             data['flavors'] = flavor_data
-            data['no_flavor_nodes'] = [
-                node for node in nodes
-                if not any(node in d['nodes'] for d in flavor_data)
-            ]
+            data['no_flavor_nodes'] = _no_flavor_nodes(nodes, flavor_data)
         else:
             distribution = collections.Counter()
 
@@ -172,18 +515,78 @@ class IndexView(views.IndexView):
                     role['distribution'] = 0
 
             if api_base.is_service_enabled(request, 'metering'):
+                # All the graphs are cut from one cached batch.
+                url = reverse('horizon:infrastructure:overview:role_load')
                 for role in data['roles']:
-                    role['graph_url'] = (
-                        reverse('horizon:infrastructure:roles:performance',
-                                args=[role['id']]) + '?' +
-                        metering.url_part('hardware.cpu.load.1min', False) +
-                        '&date_options=0.041666'
+                    role['graph_url'] = '%s?%s' % (
+                        url,
+                        django.utils.http.urlencode({
+                            'date_options': ROLE_LOAD_DATE_OPTIONS,
+                            'role': role['id'],
+                        }),
                     )
         return data
 
-    def get_progress_update(self, request, data):
+    def get(self, request, *args, **kwargs):
+        if request.META.get('HTTP_X_HORIZON_PROGRESS', ''):
+            return self.get_progress_response(request)
+        return super(IndexView, self).get(request, *args, **kwargs)
+
+    def get_progress_data(self, request):
+        """Gathers only the data needed for the progress update.
+
+           Unlike get_data, this skips the edit mode and flavor matching,
+           the node distribution and the metering graphs. The nodes are
+           listed fresh, so that their states are current.
+        """
+        self.prefetch(request, flavors=False, fresh_nodes=True)
+        data = super(IndexView, self).get_data(request, {})
+        data['nodes'] = _sorted_node_data(
+            request, inventory.list_nodes(request, fresh=True),
+            node_roles(request, data['stack']))
+        data['node_digests'] = progress.node_digests(data['nodes'])
+        return data
+
+    def get_progress_response(self, request):
+        started = time.time()
+        data = self.get_progress_data(request)
+        etag = progress.progress_etag(data, data['node_digests'])
+        if_none_match = django.utils.http.parse_etags(
+            request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match:
+            response = http.HttpResponseNotModified()
+        else:
+            response = http.HttpResponse(
+                json.dumps(self.get_progress_update(request, data)),
+                content_type='application/json',
+            )
+        response['ETag'] = django.utils.http.quote_etag(etag)
+        response['Cache-Control'] = 'private, no-cache'
+        cache.patch_vary_headers(response, (
+            'X-Horizon-Progress',
+            'X-Boxes-Nodes-Cursor',
+        ))
+        elapsed = time.time() - started
+        budget = getattr(settings, PROGRESS_BUDGET, DEFAULT_PROGRESS_BUDGET)
+        if elapsed > budget:
+            LOG.warning("Progress update for %d nodes took %.3fs, "
+                        "over the budget of %.3fs.",
+                        len(data['nodes']), elapsed, budget)
+        return response
+
+    def get_progress_update(self, request, data, cursor=None):
+        if cursor is None:
+            cursor = request.META.get(progress.CURSOR_HEADER)
         out = super(IndexView, self).get_progress_update(request, data)
-        out['nodes'] = data.get('nodes', [])
+        nodes = data.get('nodes', [])
+        if is_aggregated(nodes):
+            out['node_tiles'] = node_tiles(nodes)
+        else:
+            out.update(progress.node_delta(
+                cursor,
+                nodes,
+                data.get('node_digests'),
+            ))
         return out
 
     def get_context_data(self, **kwargs):
@@ -197,10 +600,13 @@ class IndexView(views.IndexView):
         }, {
             'name': _('Register Nodes'),
             'show_name': True,
-            'url': reverse('horizon:infrastructure:nodes:register'),
+            'url': reverse('horizon:infrastructure:overview:register'),
             'icon': 'fa-plus',
             'ajax_modal': True,
         }]
+        if getattr(settings, PROGRESS_STREAM, None):
+            context['progress_stream_url'] = reverse(
+                'horizon:infrastructure:overview:progress_stream')
         return context
 
 
@@ -211,3 +617,193 @@ class GlobalServiceConfigView(horizon.forms.ModalFormView):
 
     def get_success_url(self):
         return reverse('horizon:infrastructure:overview:index')
+
+
+class RegisterView(nodes_views.RegisterView):
+    template_name = "tuskar_boxes/overview/register.html"
+    success_url = reverse_lazy('horizon:infrastructure:overview:index')
+
+    def post(self, request, *args, **kwargs):
+        response = super(RegisterView, self).post(request, *args, **kwargs)
+        inventory.invalidate(request)
+        return response
+
+
+class NodeListView(snapshot.SnapshotMixin, infrastructure_views.StackMixin,
+                   generic.TemplateView):
+    """Lists the nodes of one count tile, one page at a time."""
+    template_name = "tuskar_boxes/overview/node_list.html"
+
+    def get_context_data(self, **kwargs):
+        context = super(NodeListView, self).get_context_data(**kwargs)
+        request = self.request
+        filters = dict((name, request.GET[name]) for name in ('role', 'state')
+                       if name in request.GET)
+        nodes = filter_nodes(
+            _sorted_node_data(request, inventory.list_nodes(request),
+                              node_roles(request, self.get_stack())),
+            **filters)
+        pages = paginator.Paginator(nodes, NODE_LIST_PAGE_SIZE)
+        try:
+            page = pages.page(request.GET.get('page', 1))
+        except paginator.InvalidPage:
+            raise http.Http404()
+
+        def page_url(number):
+            query = dict(filters, page=number)
+            return '%s?%s' % (request.path,
+                              django.utils.http.urlencode(query))
+
+        context['nodes'] = page.object_list
+        context['page'] = page
+        if page.has_previous():
+            context['previous_url'] = page_url(page.previous_page_number())
+        if page.has_next():
+            context['next_url'] = page_url(page.next_page_number())
+        return context
+
+
+class NodeInventoryView(snapshot.SnapshotMixin,
+                        infrastructure_views.StackMixin, generic.View):
+    """Lists the nodes as JSON, one page at a time.
+
+       The nodes are ordered by uuid, and the cursor is the uuid of the
+       last node of the previous page. They can be filtered by the role,
+       state and flavor parameters. The response is streamed, so the
+       serialized page is never held in memory as a whole.
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.GET.get('limit', NODE_INVENTORY_LIMIT))
+        except ValueError:
+            return http.HttpResponseBadRequest()
+        limit = min(max(limit, 1), NODE_INVENTORY_MAX_LIMIT)
+
+        records = sorted(inventory.list_nodes(request),
+                         key=lambda node: node.uuid)
+        flavor_name = request.GET.get('flavor')
+        if flavor_name is not None:
+            flavors = [flavor for flavor in inventory.list_flavors(request)
+                       if flavor.name == flavor_name]
+            node_index = NodeIndex(records)
+            records = [node for flavor in flavors[:1] for node in
+                       node_index.flavor_nodes(flavor,
+                                               MATCHING_DEPLOYMENT_MODE)]
+        cursor = request.GET.get('cursor')
+        if cursor:
+            start = bisect.bisect_right(
+                [node.uuid for node in records], cursor)
+            records = records[start:]
+
+        nodes = _iter_filtered(
+            _node_data(request, records,
+                       node_roles(request, self.get_stack())),
+            request.GET.get('role'), request.GET.get('state'))
+        response = http.StreamingHttpResponse(
+            _stream_nodes(nodes, limit),
+            content_type='application/json',
+        )
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+def cached_role_load(request, stack, date_options=ROLE_LOAD_DATE_OPTIONS):
+    """Returns the role load graphs, building them at most once at a time.
+
+       The graphs are cached for ROLE_LOAD_CACHE_TTL seconds. On a miss,
+       only the request that takes the lock builds them, and the others
+       wait up to ROLE_LOAD_LOCK_WAIT seconds for the result. If it still
+       isn't there by then, no graphs are returned.
+    """
+    key = 'tuskar_boxes:role_load:%s:%s:%s' % (
+        getattr(request.user, 'tenant_id', None), stack.id, date_options)
+    lock_key = key + ':lock'
+    deadline = time.time() + ROLE_LOAD_LOCK_WAIT
+    while True:
+        graphs = django_cache.cache.get(key)
+        if graphs is not None:
+            return graphs
+        if django_cache.cache.add(lock_key, True, ROLE_LOAD_LOCK_TTL):
+            try:
+                graphs = role_load(request, stack, date_options)
+                django_cache.cache.set(key, graphs, ROLE_LOAD_CACHE_TTL)
+            finally:
+                django_cache.cache.delete(lock_key)
+            return graphs
+        if time.time() >= deadline:
+            LOG.warning("Gave up waiting for the role load of stack %s.",
+                        stack.id)
+            return {}
+        time.sleep(ROLE_LOAD_LOCK_POLL)
+
+
+class RoleLoadView(snapshot.SnapshotMixin, infrastructure_views.StackMixin,
+                   generic.View):
+    """Serves the load graphs of all the roles in one response.
+
+       With the role parameter, only the graph of that role is returned,
+       in the format of the role performance view. The graphs of all the
+       roles are built and cached together, so the charts of one page
+       share them.
+    """
+
+    def get(self, request, *args, **kwargs):
+        stack = self.get_stack()
+        graphs = {}
+        if stack:
+            graphs = cached_role_load(
+                request, stack,
+                request.GET.get('date_options', ROLE_LOAD_DATE_OPTIONS))
+        role_id = request.GET.get('role')
+        if role_id is None:
+            out = {'roles': graphs}
+        else:
+            out = graphs.get(role_id)
+        return http.HttpResponse(json.dumps(out),
+                                 content_type='application/json')
+
+
+class ProgressStreamView(generic.View):
+    """Streams the deployment progress as server-sent events.
+
+    Enabled by the TUSKAR_BOXES_PROGRESS_STREAM setting. All the streams
+    of a stack share one watcher, so the backends are asked once per
+    interval no matter how many dashboards are open.
+    """
+
+    def get(self, request, *args, **kwargs):
+        config = getattr(settings, PROGRESS_STREAM, None)
+        if not config:
+            raise http.Http404()
+        interval = config.get('interval', DEFAULT_STREAM_INTERVAL)
+        duration = config.get('duration', DEFAULT_STREAM_DURATION)
+
+        plan = snapshot.call(request, api.tuskar.Plan.get_the_plan)
+        stack = snapshot.call(request, api.heat.Stack.get_by_plan, plan)
+        if not stack:
+            # Tells the browser not to reconnect.
+            return http.HttpResponse(status=204)
+        watcher = progress.get_watcher(
+            (getattr(request.user, 'tenant_id', None), stack.id), interval)
+        index_view = IndexView()
+
+        def load():
+            # Load from a fresh copy of the request and view, so that
+            # nothing memoized in the previous round is reused.
+            load_request = copy.copy(request)
+            snapshot.invalidate(load_request)
+            view = IndexView(request=load_request, args=(), kwargs={})
+            return view.get_progress_data(load_request)
+
+        def build_update(data, cursor):
+            return index_view.get_progress_update(request, data, cursor)
+
+        response = http.StreamingHttpResponse(
+            progress.stream_events(watcher, load, build_update,
+                                   interval, duration),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -26,39 +26,74 @@ tuskar.boxes = (function () {
     });
   };
 
+  // The node elements of the flavor, and the role each of them shows,
+  // are remembered, so that only the nodes whose role changed need to be
+  // touched.
+  module.get_model = function ($flavor) {
+    var model = $flavor.data('boxes-model');
+    if (!model) {
+      model = {
+        nodes: $flavor.find('div.boxes-nodes div.boxes-node').toArray(),
+        assigned: []
+      };
+      $flavor.data('boxes-model', model);
+    }
+    return model;
+  };
+
   module.update_nodes = function ($flavor, roles) {
+    var model = module.get_model($flavor);
     var role_names = Object.getOwnPropertyNames(roles);
     var count = 0;
     var role = 0;
-    $flavor.find('div.boxes-nodes div.boxes-node').each(function () {
-      var $this = $(this);
-      $this.removeClass('boxes-role-controller boxes-role-compute boxes-role-cinder-storage boxes-role-swift-storage boxes-role-none');
+    var free_nodes = 0;
+    $.each(model.nodes, function (i, node) {
       while (count >= roles[role_names[role]]) {
         role += 1;
         count = 0;
       }
-      if (!role_names[role]) {
-        $(this).html('free');
-        $(this).addClass('boxes-role-none');
+      var name = role_names[role] || 'none';
+      count += 1;
+      if (name === 'none') { free_nodes += 1; }
+      if (model.assigned[i] === name) { return; }
+      var $node = $(node);
+      if (model.assigned[i] === undefined) {
+        $node.removeClass('boxes-role-controller boxes-role-compute boxes-role-cinder-storage boxes-role-swift-storage boxes-role-none');
       } else {
-        $this.addClass('boxes-role-' + role_names[role]).html('&nbsp;');
+        $node.removeClass('boxes-role-' + model.assigned[i]);
       }
-      count += 1;
+      $node.addClass('boxes-role-' + name);
+      if (name === 'none') {
+        $node.html('free');
+      } else {
+        $node.html('&nbsp;');
+      }
+      model.assigned[i] = name;
     });
-    var free_nodes = $flavor.find('div.boxes-nodes div.boxes-role-none').length;
     $flavor.find('span.free-nodes').text(free_nodes);
   };
 
-  module.update_boxes = function () {
-    $('div.boxes-flavor').each(function () {
-        var $flavor = $(this);
-        var role_counts = module.get_role_counts($flavor);
-        var nodes_count = $flavor.find('div.boxes-nodes div.boxes-node').length;
-        module.update_nodes($flavor, role_counts);
-        module.update_maximums($flavor, role_counts, nodes_count);
+  module.update_flavor = function ($flavor) {
+    var role_counts = module.get_role_counts($flavor);
+    var nodes_count = module.get_model($flavor).nodes.length;
+    module.update_nodes($flavor, role_counts);
+    module.update_maximums($flavor, role_counts, nodes_count);
+  };
+
+  // Updates the given flavors, or all of them if none are given.
+  module.update_boxes = function ($flavors) {
+    if (!$flavors || !$flavors.jquery) {
+      $flavors = $('div.boxes-flavor');
+    }
+    $flavors.each(function () {
+      module.update_flavor($(this));
     });
   };
 
+  module.update_later = function ($flavors) {
+    window.setTimeout(function () { module.update_boxes($flavors); }, 0);
+  };
+
   module.init = function () {
     if ($('div.boxes-available-roles').length === 0) {
       // Only activate on a page that has the right classes.
@@ -68,7 +103,10 @@ tuskar.boxes = (function () {
         revert: 'invalid',
         helper: 'clone',
         zIndex: 1000,
-        opacity: 0.5
+        opacity: 0.5,
+        start: function () {
+          $(this).data('boxes-source', $(this).closest('div.boxes-flavor'));
+        }
     });
     $('div.boxes-drop').droppable({
         accept: 'div.boxes-role',
@@ -76,13 +114,14 @@ tuskar.boxes = (function () {
         hoverClass: 'boxes-drop-hover',
         tolerance: 'touch',
         drop: function (ev, ui) {
+          var $source = ui.draggable.data('boxes-source') || $();
           ui.draggable.appendTo($(this).parent().prev('.boxes-drop-roles'));
           var $count = ui.draggable.find('input.number-picker');
           if (+$count.val() < 1 && +$count.attr('max') >= 1) { $count.val(1); }
           ui.draggable.find('input.boxes-flavor'
               ).val($(this).closest('.boxes-flavor').data('flavor'));
           $count.trigger('change');
-          window.setTimeout(module.update_boxes, 0);
+          module.update_later($source.add($(this).closest('div.boxes-flavor')));
         }
     });
     $('div.boxes-available-roles').droppable({
@@ -91,31 +130,36 @@ tuskar.boxes = (function () {
         hoverClass: 'boxes-drop-hover',
         tolerance: 'touch',
         drop: function (ev, ui) {
+          var $source = ui.draggable.data('boxes-source') || $();
           ui.draggable.appendTo(this);
           ui.draggable.find('input.boxes-flavor').val('');
           ui.draggable.find('input.number-picker').trigger('change').val(0);
-          window.setTimeout(module.update_boxes, 0);
+          module.update_later($source);
         }
     });
 
     module.update_boxes();
-    $('input.number-picker').change(module.update_boxes);
+    $('input.number-picker').change(function () {
+      module.update_boxes($(this).closest('div.boxes-flavor'));
+    });
 
     $('.boxes-roles-menu li a').click(function () {
         var name = $(this).data('role');
         var $drop = $(this).closest('.boxes-drop-group').prev('.boxes-drop-roles');
         var $role = $('.boxes-role[data-name="' + name + '"]');
+        var $source = $role.closest('div.boxes-flavor');
         var $count = $role.find('input.number-picker');
         var $flavor = $role.find('input.boxes-flavor');
         $role.appendTo($drop);
         if (+$count.val() < 1) { $count.val(1); }
         $flavor.val($drop.closest('.boxes-flavor').data('flavor'));
         $count.trigger('change');
-        window.setTimeout(module.update_boxes, 0);
+        module.update_later($source.add($drop.closest('div.boxes-flavor')));
     });
 
     $('.deploy-role-remove').click(function () {
         var $role = $(this).closest('.boxes-role');
+        var $source = $role.closest('div.boxes-flavor');
         var $count = $role.find('input.number-picker');
         var $flavor = $role.find('input.boxes-flavor');
         var $drop = $('.boxes-available-roles');
@@ -123,7 +167,7 @@ tuskar.boxes = (function () {
         $flavor.val('');
         $count.val(0);
         $count.trigger('change');
-        window.setTimeout(module.update_boxes, 0);
+        module.update_later($source);
     });
   };
 
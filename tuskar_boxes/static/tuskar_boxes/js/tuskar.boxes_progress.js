@@ -4,16 +4,223 @@ tuskar.boxes_progress = function () {
 
   module.init = function () {
     module.nodes_template = Hogan.compile($('#nodes-template').html() || '');
+    module.details_template = Hogan.compile(
+      $('#node-details-template').html() || '');
+    module.details = null;
+    module.tiles_template = Hogan.compile($('#tiles-template').html() || '');
+    module.nodes_cursor = null;
+    var stream_url = $('span.boxes-progress-stream').data('url');
+    var in_progress = $('div.deployment-box div.progress').length > 0;
+    if (stream_url && in_progress && window.EventSource) {
+      module.subscribe(stream_url);
+    }
+  };
+
+  // Receive the progress updates pushed by the server instead of polling.
+  module.subscribe = function (url) {
+    var source = new EventSource(url);
+    source.addEventListener('progress', function (ev) {
+      tuskar.deployment_progress.update_progress(JSON.parse(ev.data));
+    });
+    source.onerror = function () {
+      if (source.readyState === EventSource.CLOSED) {
+        // The server refused the stream, go back to polling.
+        module.start_polling();
+      }
+    };
+    window.clearInterval(tuskar.deployment_progress.interval);
+    tuskar.deployment_progress.interval = null;
+    module.source = source;
+  };
+
+  module.start_polling = function () {
+    if (tuskar.deployment_progress.interval) { return; }
+    tuskar.deployment_progress.interval = window.setInterval(function () {
+      tuskar.deployment_progress.check_progress();
+    }, 30000);
+  };
+
+  // The details shown in the popovers are shipped once per page, as one
+  // list per field, and only indexed by uuid when first needed.
+  module.load_details = function () {
+    var columns = JSON.parse($('#boxes-node-details').html() || '{}');
+    var details = {};
+    $.each(columns.uuid || [], function (i, uuid) {
+      var node = {};
+      $.each(columns, function (field, values) { node[field] = values[i]; });
+      details[uuid] = node;
+    });
+    return details;
+  };
+
+  module.get_details = function (uuid) {
+    if (!module.details) { module.details = module.load_details(); }
+    return module.details[uuid];
+  };
+
+  module.node_content = function () {
+    var node = module.get_details(this.getAttribute('data-uuid'));
+    return node ? module.details_template.render(node) : '';
+  };
+
+  // One delegated handler on the container serves the popovers of all
+  // its nodes, including the ones added later.
+  module.bind_popovers = function ($containers) {
+    $containers.each(function () {
+      var $container = $(this);
+      if ($container.data('boxes-popovers')) { return; }
+      $container.data('boxes-popovers', true);
+      $container.popover({
+        'selector': 'div.boxes-node',
+        'trigger': 'hover',
+        'placement': 'auto',
+        'delay': 500,
+        'html': true,
+        'content': module.node_content
+      });
+    });
+  };
+
+  module.node_key = function (node) {
+    return [
+      node.role_slug, node.state_slug, node.state_icon, node.node_title,
+      node.cpu_arch, node.cpus, node.memory_mb, node.local_gb
+    ].join('|');
+  };
+
+  module.render_node = function (node) {
+    var html = $.trim(module.nodes_template.render({'nodes': [node]}));
+    var element = $(html)[0];
+    element.boxes_key = module.node_key(node);
+    return element;
+  };
+
+  module.index_nodes = function (container) {
+    var elements = {};
+    $(container).children('div.boxes-node').each(function () {
+      elements[this.getAttribute('data-uuid')] = this;
+    });
+    return elements;
+  };
+
+  // Updates the element of the node in place, or creates it. Nodes that
+  // didn't change since the last update are left alone.
+  module.patch_node = function (container, elements, node) {
+    var old = elements[node.uuid];
+    if (old && old.boxes_key === module.node_key(node)) { return old; }
+    var element = module.render_node(node);
+    if (old) {
+      $(old).popover('destroy');
+      container.replaceChild(element, old);
+    } else {
+      container.appendChild(element);
+    }
+    elements[node.uuid] = element;
+    return element;
+  };
+
+  // The server lists the nodes by their role names in descending order,
+  // so the node goes after the last one with the same or a later role.
+  module.insert_sorted = function (container, element) {
+    var role = element.getAttribute('data-role') || '';
+    container.removeChild(element);
+    var child = container.firstElementChild;
+    while (child && (child.getAttribute('data-role') || '') >= role) {
+      child = child.nextElementSibling;
+    }
+    container.insertBefore(element, child);
+  };
+
+  module.remove_node = function (elements, uuid) {
+    var element = elements[uuid];
+    if (element) {
+      $(element).popover('destroy').remove();
+      delete elements[uuid];
+    }
+  };
+
+  module.update_container = function (container, data) {
+    var elements = module.index_nodes(container);
+    if (data.nodes_full === false) {
+      // Only the nodes that changed since the last update were sent.
+      $.each(data.nodes_removed || [], function (i, uuid) {
+        module.remove_node(elements, uuid);
+      });
+      $.each(data.nodes, function (i, node) {
+        var old = elements[node.uuid];
+        var element = module.patch_node(container, elements, node);
+        if (!old || old.getAttribute('data-role') !==
+            element.getAttribute('data-role')) {
+          module.insert_sorted(container, element);
+        }
+      });
+      return;
+    }
+    var previous = null;
+    $.each(data.nodes, function (i, node) {
+      var element = module.patch_node(container, elements, node);
+      var expected = (previous ? previous.nextElementSibling :
+                      container.firstElementChild);
+      if (element !== expected) {
+        container.insertBefore(element, expected);
+      }
+      previous = element;
+    });
+    // Whatever is left after the listed nodes is gone.
+    var extra = (previous ? previous.nextElementSibling :
+                 container.firstElementChild);
+    while (extra) {
+      var next = extra.nextElementSibling;
+      $(extra).popover('destroy').remove();
+      extra = next;
+    }
+  };
+
+  // Turns the node boxes into a tiles container, once the deployment
+  // grew too large to show every node.
+  module.replace_with_tiles = function (container) {
+    var $container = $(container);
+    $container.popover('destroy').removeData('boxes-popovers');
+    $container.removeClass('boxes-nodes boxes-nodes-small boxes-nodes-medium');
+    $container.addClass('boxes-tiles').empty();
   };
 
   module.update_progress = function (data) {
+    if (data.node_tiles) {
+      // Large deployments only get the counts per role and state.
+      $('div.boxes-nodes').each(function () {
+        module.replace_with_tiles(this);
+      });
+      $('div.boxes-tiles').html(
+        module.tiles_template.render({'tiles': data.node_tiles}));
+    }
+    module.nodes_cursor = data.nodes_cursor || null;
+    if (!data.nodes) { return; }
     var $nodes = $('div.boxes-nodes');
-    $nodes.html(module.nodes_template.render(data));
-    $nodes.find('div.boxes-node').popover({
-      'trigger': 'hover',
-      'placement': 'auto',
-      'delay': 500,
-      'html': true
+    if (!module.details) { module.details = module.load_details(); }
+    $.each(data.nodes, function (i, node) {
+      module.details[node.uuid] = node;
+    });
+    $nodes.each(function () {
+      module.update_container(this, data);
+    });
+    module.bind_popovers($nodes);
+  };
+
+  // Send the cursor of the last update, to only get the changed nodes.
+  tuskar.deployment_progress.check_progress = function () {
+    var $form = $('form.deployment-roles-form');
+    var headers = {'X-Horizon-Progress': 'true'};
+    if (module.nodes_cursor) {
+      headers['X-Boxes-Nodes-Cursor'] = module.nodes_cursor;
+    }
+    $.ajax({
+      type: 'GET',
+      headers: headers,
+      url: $form.attr('action'),
+      dataType: 'json',
+      async: true,
+      success: tuskar.deployment_progress.update_progress
     });
   };
 
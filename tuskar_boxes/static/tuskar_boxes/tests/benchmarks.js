@@ -0,0 +1,103 @@
+horizon.addInitFunction(function () {
+  "use strict";
+
+  module("Tuskar boxes benchmarks");
+
+  var make_node = function (i, state_slug) {
+    return {
+      "uuid": "node-" + i,
+      "cpu_arch": "x86_64",
+      "role_slug": ["", "compute", "controller"][i % 3],
+      "state_slug": state_slug,
+      "node_title": "Node " + i,
+      "cpus": 1,
+      "memory_mb": 4096,
+      "local_gb": 40,
+      "state_icon": "fa-spinner fa-spin"
+    };
+  };
+
+  var time = function (callback) {
+    var started = new Date().getTime();
+    callback();
+    return new Date().getTime() - started;
+  };
+
+  // The timings depend on the machine, so they are only reported.
+  var report = function (message) {
+    if (window.console && window.console.log) {
+      window.console.log(message);
+    }
+  };
+
+  test("update_progress with 5000 nodes", function () {
+    var count = 5000;
+    var nodes = [];
+    var i;
+    for (i = 0; i < count; i += 1) { nodes.push(make_node(i, "provisioning")); }
+    var $nodes = $('<div class="boxes-nodes"></div>').appendTo('#qunit-fixture');
+
+    var render_time = time(function () {
+      tuskar.boxes_progress.update_progress({"nodes": nodes});
+    });
+    equal($nodes.children('div.boxes-node').length, count);
+
+    // A full update where only every hundredth node changed.
+    for (i = 0; i < count; i += 100) { nodes[i] = make_node(i, "provisioned"); }
+    var patch_time = time(function () {
+      tuskar.boxes_progress.update_progress({"nodes": nodes});
+    });
+    equal($nodes.children('div.boxes-node').length, count);
+    equal($nodes.find('div.status-provisioned').length, count / 100);
+
+    report("Rendered " + count + " nodes in " + render_time + "ms, " +
+           "patched " + (count / 100) + " of them in " + patch_time + "ms.");
+  });
+
+  var make_flavor = function (name, nodes) {
+    var html = ['<div class="boxes-flavor" data-flavor="' + name + '">',
+                '<div class="boxes-drop-roles">'];
+    $.each(['controller', 'compute'], function (i, role) {
+      html.push('<div class="boxes-role" data-name="' + role + '">' +
+                '<input class="number-picker" type="text" value="1" />' +
+                '</div>');
+    });
+    html.push('</div><span class="free-nodes"></span>',
+              '<div class="boxes-nodes">');
+    for (var i = 0; i < nodes; i += 1) {
+      html.push('<div class="boxes-node boxes-role-"></div>');
+    }
+    html.push('</div></div>');
+    return html.join('');
+  };
+
+  test("update_boxes with 50 flavors and 5000 nodes", function () {
+    var flavors = 50;
+    var nodes = 100;
+    var html = [];
+    var i;
+    for (i = 0; i < flavors; i += 1) {
+      html.push(make_flavor('flavor-' + i, nodes));
+    }
+    $('#qunit-fixture').html(html.join(''));
+    var $flavors = $('#qunit-fixture div.boxes-flavor');
+
+    var full_time = time(function () { tuskar.boxes.update_boxes($flavors); });
+    equal($flavors.find('div.boxes-role-none').length,
+          flavors * (nodes - 2));
+
+    // Changing one picker only recomputes the flavor it belongs to.
+    var $flavor = $flavors.last();
+    $flavor.find('input.number-picker').last().val(10);
+    var flavor_time = time(function () {
+      tuskar.boxes.update_boxes($flavor);
+    });
+    equal($flavor.find('div.boxes-role-compute').length, 10);
+    equal($flavor.find('span.free-nodes').text(), String(nodes - 11));
+    equal($flavors.find('div.boxes-role-none').length,
+          flavors * (nodes - 2) - 9);
+
+    report("Updated " + flavors + " flavors in " + full_time + "ms, " +
+           "one flavor in " + flavor_time + "ms.");
+  });
+});
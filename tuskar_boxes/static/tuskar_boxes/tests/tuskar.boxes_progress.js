@@ -24,4 +24,152 @@ horizon.addInitFunction(function () {
     // No logic to test here, just make sure the function runs without errors.
     expect(0);
   });
+
+  test("update_progress with changed nodes only", function () {
+    var node = function (uuid, role_slug) {
+      return {
+        "uuid": uuid,
+        "cpu_arch": "x86_64",
+        "role_slug": role_slug,
+        "state_slug": "free",
+        "node_title": "Free node",
+        "cpus": 1,
+        "memory_mb": 4096,
+        "local_gb": 40,
+        "state_icon": "fa-minus"
+      };
+    };
+    var $nodes = $('<div class="boxes-nodes"></div>').appendTo('#qunit-fixture');
+
+    tuskar.boxes_progress.update_progress({
+      "nodes": [node("a", ""), node("b", ""), node("c", "")],
+      "nodes_cursor": "first",
+      "nodes_full": true
+    });
+    equal($nodes.find('div.boxes-node').length, 3);
+    equal(tuskar.boxes_progress.nodes_cursor, "first");
+
+    tuskar.boxes_progress.update_progress({
+      "nodes": [node("b", "compute"), node("d", "")],
+      "nodes_removed": ["c"],
+      "nodes_cursor": "second",
+      "nodes_full": false
+    });
+    equal($nodes.find('div.boxes-node').length, 3);
+    equal($nodes.find('div.boxes-node[data-uuid="b"]').hasClass('boxes-role-compute'), true);
+    equal($nodes.find('div.boxes-node[data-uuid="c"]').length, 0);
+    equal($nodes.find('div.boxes-node[data-uuid="d"]').length, 1);
+    equal(tuskar.boxes_progress.nodes_cursor, "second");
+  });
+
+  test("update_progress keeps the changed nodes sorted", function () {
+    var node = function (uuid, role_name) {
+      return {
+        "uuid": uuid,
+        "cpu_arch": "x86_64",
+        "role_name": role_name,
+        "role_slug": role_name.toLowerCase(),
+        "state_slug": "free",
+        "node_title": "Node",
+        "cpus": 1,
+        "memory_mb": 4096,
+        "local_gb": 40,
+        "state_icon": "fa-minus"
+      };
+    };
+    var order = function ($nodes) {
+      return $nodes.find('div.boxes-node').map(function () {
+        return this.getAttribute('data-uuid');
+      }).get().join(' ');
+    };
+    var $nodes = $('<div class="boxes-nodes"></div>').appendTo('#qunit-fixture');
+
+    tuskar.boxes_progress.update_progress({
+      "nodes": [node("a", "Controller"), node("b", "Compute"),
+                node("c", "")],
+      "nodes_full": true
+    });
+    equal(order($nodes), "a b c");
+
+    tuskar.boxes_progress.update_progress({
+      "nodes": [node("d", "Compute"), node("c", "Controller"),
+                node("e", "")],
+      "nodes_full": false
+    });
+    equal(order($nodes), "a c b d e");
+    equal($nodes.find('div.boxes-node[data-uuid="c"]').hasClass(
+      'status-free'), true);
+  });
+
+  test("node_content", function () {
+    var $nodes = $('<div class="boxes-nodes"></div>').appendTo('#qunit-fixture');
+
+    tuskar.boxes_progress.update_progress({
+      "nodes": [{
+        "uuid": "popover-node",
+        "cpu_arch": "x86_64",
+        "role_slug": "",
+        "state_slug": "free",
+        "node_title": "Free node",
+        "cpus": 2,
+        "memory_mb": 4096,
+        "local_gb": 40,
+        "state_icon": "fa-minus"
+      }]
+    });
+    var element = $nodes.find('div.boxes-node[data-uuid="popover-node"]')[0];
+    var content = $.trim(tuskar.boxes_progress.node_content.call(element));
+    equal($(content).find('dd').first().text(), "popover-node");
+    equal($(content).find('dd').eq(3).text(), "4096");
+    equal(tuskar.boxes_progress.node_content.call(
+      $('<div data-uuid="unknown"></div>')[0]), '');
+  });
+
+  test("update_progress with node tiles", function () {
+    var $tiles = $('<div class="boxes-tiles"></div>').appendTo('#qunit-fixture');
+
+    tuskar.boxes_progress.update_progress({
+      "node_tiles": [{
+        "role_slug": "compute",
+        "state_slug": "provisioning",
+        "state_icon": "fa-spinner fa-spin",
+        "node_title": "Compute node",
+        "url": "/infrastructure/overview/nodes?role=compute",
+        "count": 4000
+      }, {
+        "role_slug": "",
+        "state_slug": "free",
+        "state_icon": "fa-minus",
+        "node_title": "Free node",
+        "url": "/infrastructure/overview/nodes?role=",
+        "count": 10
+      }]
+    });
+    equal($tiles.find('a.boxes-tile').length, 2);
+    equal($tiles.find('a.boxes-role-compute span.boxes-tile-count').text(),
+          "4000");
+  });
+
+  test("update_progress with node tiles replaces the nodes", function () {
+    var $nodes = $('<div class="boxes-nodes boxes-nodes-small col-xs-7">' +
+                   '<div class="boxes-node" data-uuid="a"></div></div>'
+                  ).appendTo('#qunit-fixture');
+
+    tuskar.boxes_progress.update_progress({
+      "node_tiles": [{
+        "role_slug": "compute",
+        "state_slug": "provisioning",
+        "state_icon": "fa-spinner fa-spin",
+        "node_title": "Compute node",
+        "url": "/infrastructure/overview/nodes?role=compute",
+        "count": 4000
+      }]
+    });
+    equal($nodes.hasClass('boxes-nodes'), false);
+    equal($nodes.hasClass('boxes-tiles'), true);
+    equal($nodes.hasClass('col-xs-7'), true);
+    equal($nodes.find('div.boxes-node').length, 0);
+    equal($nodes.find('a.boxes-tile').length, 1);
+    equal($('#qunit-fixture div.boxes-nodes').length, 0);
+  });
 });
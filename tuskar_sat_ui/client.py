@@ -0,0 +1,72 @@
+# -*- coding: utf8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""A client for the Satellite API that keeps its connections open."""
+
+from django.conf import settings
+import requests
+from requests import adapters
+from requests.packages.urllib3.util import retry
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUSES = frozenset([502, 503, 504])
+
+
+class SatelliteClient(object):
+    """Makes the requests to Satellite through a pool of connections.
+
+    The timeout is either a number of seconds for both connecting and
+    reading, or a pair of the connect and read timeouts.
+    Only GET requests are retried, with an exponentially growing wait
+    between the tries.
+    """
+
+    def __init__(self, admin_url, api_url, auth, organization,
+                 pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+        self.admin_url = admin_url
+        self.api_url = api_url
+        self.organization = organization
+        if isinstance(timeout, (list, tuple)):
+            self.timeout = tuple(timeout)
+        else:
+            self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.session.verify = not getattr(settings, 'OPENSTACK_SSL_NO_VERIFY',
+                                          False)
+        adapter = adapters.HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry.Retry(
+                total=retries,
+                backoff_factor=backoff,
+                status_forcelist=RETRY_STATUSES,
+                method_whitelist=frozenset(['GET']),
+            ),
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, path, **params):
+        """Makes a GET request to the API and returns the decoded JSON."""
+        url = '{api_url}{path}'.format(api_url=self.api_url, path=path)
+        r = self.session.get(url, params=params or None,
+                             timeout=self.timeout)
+        r.raise_for_status()  # Raise an error if the request failed
+        return r.json()
@@ -0,0 +1,146 @@
+# -*- coding: utf8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Persistent mapping of the Ironic nodes to the Satellite hosts.
+
+Horizon doesn't necessarily have a database configured, so instead of
+Django models the mapping is kept in a small SQLite file, set with the
+SATELLITE_HOST_MAPPING_DB setting.
+"""
+
+import contextlib
+import logging
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+
+
+HOST_MAPPING_DB = 'SATELLITE_HOST_MAPPING_DB'
+DEFAULT_DB_NAME = 'tuskar_sat_ui_hosts.sqlite3'
+LOG = logging.getLogger('tuskar_sat_ui')
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS host_mapping (
+    node_uuid TEXT PRIMARY KEY,
+    addresses TEXT NOT NULL,
+    satellite_uuid TEXT NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+_mappings = {}
+
+
+def _addresses_key(addresses):
+    return ','.join(sorted(mac.upper() for mac in addresses))
+
+
+class HostMapping(object):
+    """Remembers which Satellite host belongs to which Ironic node.
+
+    An entry is only valid for the MAC addresses it was found with, so a
+    node that got different NICs is looked up again. Errors of the
+    database are logged and treated as a miss, the mapping is only there
+    to save searches.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._created = False
+
+    @contextlib.contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                if not self._created:
+                    connection.execute(_CREATE_TABLE)
+                    self._created = True
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, node_uuid, addresses):
+        """Returns the remembered Satellite host UUID, or None."""
+        try:
+            with self._connect() as connection:
+                row = connection.execute(
+                    'SELECT addresses, satellite_uuid FROM host_mapping '
+                    'WHERE node_uuid = ?', (node_uuid,)).fetchone()
+        except sqlite3.Error:
+            LOG.warning("Could not read the host mapping from %s.",
+                        self.path, exc_info=True)
+            return None
+        if row is None or row[0] != _addresses_key(addresses):
+            return None
+        return row[1]
+
+    def set(self, node_uuid, addresses, satellite_uuid):
+        """Remembers the Satellite host UUID of the node."""
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO host_mapping '
+                    '(node_uuid, addresses, satellite_uuid, updated) '
+                    'VALUES (?, ?, ?, ?)',
+                    (node_uuid, _addresses_key(addresses), satellite_uuid,
+                     time.time()))
+        except sqlite3.Error:
+            LOG.warning("Could not write the host mapping to %s.",
+                        self.path, exc_info=True)
+
+    def forget(self, node_uuid):
+        """Drops the entry of the node, if there is one."""
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    'DELETE FROM host_mapping WHERE node_uuid = ?',
+                    (node_uuid,))
+        except sqlite3.Error:
+            LOG.warning("Could not write the host mapping to %s.",
+                        self.path, exc_info=True)
+
+
+class NoHostMapping(object):
+    """Remembers nothing, used when there is no safe place for the file."""
+
+    def get(self, node_uuid, addresses):
+        return None
+
+    def set(self, node_uuid, addresses, satellite_uuid):
+        pass
+
+    def forget(self, node_uuid):
+        pass
+
+
+def host_mapping():
+    """Returns the :class:`HostMapping` of the configured database file.
+
+    Without SATELLITE_HOST_MAPPING_DB, the file is kept in the dashboard's
+    LOCAL_PATH. A shared directory such as /tmp is never used, as anybody
+    could put a file with wrong hosts there, so without either setting
+    nothing is remembered.
+    """
+    path = getattr(settings, HOST_MAPPING_DB, None)
+    if not path:
+        local_path = getattr(settings, 'LOCAL_PATH', None)
+        if not local_path:
+            return NoHostMapping()
+        path = os.path.join(local_path, DEFAULT_DB_NAME)
+    try:
+        return _mappings[path]
+    except KeyError:
+        return _mappings.setdefault(path, HostMapping(path))
@@ -31,6 +31,10 @@ class ErrataTable(tables.DataTable):
     issued = tables.Column('issued',
                            verbose_name=_("Date Issued"))
 
+    def __init__(self, request, data=None, as_of=None, **kwargs):
+        super(ErrataTable, self).__init__(request, data=data, **kwargs)
+        self.as_of = as_of
+
     class Meta:
         name = "erratatable"
         verbose_name = _("Errata")
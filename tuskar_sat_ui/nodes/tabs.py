@@ -12,10 +12,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import collections
+import datetime
+import json
 import logging
+import threading
+import time
 
 
 from django.conf import settings
+from django.core import cache
+from django.core import urlresolvers
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 import horizon.messages
 from horizon import tabs
@@ -24,6 +31,8 @@ import requests_oauthlib
 from tuskar_ui import api
 from tuskar_ui.infrastructure.nodes import tabs as nodes_tabs
 
+from tuskar_sat_ui import client as sat_client
+from tuskar_sat_ui import models
 from tuskar_sat_ui.nodes import tables
 
 
@@ -31,10 +40,20 @@ SAT_HOST_PARAM = 'satellite_host'
 SAT_API_PARAM = 'satellite_api'
 SAT_AUTH_PARAM = 'satellite_auth'
 SAT_ORG_PARAM = 'satellite_org'
+SAT_INTERFACES_PARAM = 'satellite_interfaces'
+SAT_POOL_SIZE_PARAM = 'satellite_pool_size'
+SAT_TIMEOUT_PARAM = 'satellite_timeout'
+SAT_RETRIES_PARAM = 'satellite_retries'
 SAT_CONFIG = 'SATELLITE_CONFIG'
+DEFAULT_INTERFACES = ['eth0', 'eth1', 'en0', 'en1']
+ERRATA_CACHE_TTL = 'SATELLITE_ERRATA_CACHE_TTL'
+ERRATA_CACHE_STALE_TTL = 'SATELLITE_ERRATA_CACHE_STALE_TTL'
+DEFAULT_ERRATA_CACHE_TTL = 3600
+DEFAULT_ERRATA_CACHE_STALE_TTL = 86400
+ERRATA_REFRESH_TIMEOUT = 300
 
-VERIFY_SSL = not getattr(settings, 'OPENSTACK_SSL_NO_VERIFY', False)
 LOG = logging.getLogger('tuskar_sat_ui')
+_clients = {}
 ErrataItem = collections.namedtuple('ErrataItem', [
     'title',
     'type',
@@ -73,6 +92,14 @@ class NoErrataError(Error):
     """There is no errata for that node."""
 
 
+class ErrataUnavailable(Error):
+    """The errata of the node can't be shown, the message tells why."""
+
+    def __init__(self, message=None, *args, **kwargs):
+        super(ErrataUnavailable, self).__init__(message, *args, **kwargs)
+        self.message = message
+
+
 def _get_satellite_config():
     """Find the Satellite configuration data.
 
@@ -116,6 +143,30 @@ def _get_satellite_config():
     return admin_url, api_url, auth, organization
 
 
+def _get_client():
+    """Get the Satellite client for the current configuration.
+
+    The clients are kept for the life of the process, so that their
+    connections and the parsed authentication are reused.
+    """
+
+    config = getattr(settings, SAT_CONFIG, None)
+    key = json.dumps(config, sort_keys=True)
+    try:
+        return _clients[key]
+    except KeyError:
+        pass
+    admin_url, api_url, auth, organization = _get_satellite_config()
+    client = sat_client.SatelliteClient(
+        admin_url, api_url, auth, organization,
+        pool_size=config.get(SAT_POOL_SIZE_PARAM,
+                             sat_client.DEFAULT_POOL_SIZE),
+        timeout=config.get(SAT_TIMEOUT_PARAM, sat_client.DEFAULT_TIMEOUT),
+        retries=config.get(SAT_RETRIES_PARAM, sat_client.DEFAULT_RETRIES),
+    )
+    return _clients.setdefault(key, client)
+
+
 def _get_stack(request):
     """Find the stack."""
 
@@ -130,45 +181,187 @@ def _get_stack(request):
     return stack
 
 
-def _find_uuid_by_mac(api_url, auth, organization, addresses):
+def _get_interfaces():
+    """The names of the interfaces to look for the MAC addresses on."""
+
+    config = getattr(settings, SAT_CONFIG, {})
+    return config.get(SAT_INTERFACES_PARAM, DEFAULT_INTERFACES)
+
+
+def _find_uuid_by_mac(client, addresses, interfaces=None):
     """Pick up the UUID from the MAC address.
 
-    This makes no sense, as we need both MAC address and the interface, and
-    we don't have the interface, so we need to make multiple slow searches.
-    If the Satellite UUID isn't the same as this one, and it probably
-    isn't, we need to store a mapping somewhere.
+    We have the MAC addresses, but not the interfaces they are on, so we
+    search for all the combinations in a single query. When more than one
+    host matches, the one matching the earliest address and interface is
+    picked. The Satellite UUID isn't the same as the node's one, so the
+    result is remembered by :func:`_find_node_errata`.
     """
 
-    url = '{api_url}/katello/api/v2/systems'.format(api_url=api_url)
-    for mac in addresses:
-        for interface in ['eth0', 'eth1', 'en0', 'en1']:
-            q = 'facts.net.interface.{iface}.mac_address:"{mac}"'.format(
-                iface=interface, mac=mac.upper())
-            params = {'search': q, 'organization_id': organization}
-            r = requests.get(url, params=params, auth=auth,
-                             verify=VERIFY_SSL)
-            r.raise_for_status()  # Raise an error if the request failed
-            contexts = r.json()['results']
-            if contexts:
-                return contexts[0]['uuid']
-    raise NodeNotFound()
-
-
-def _get_errata_data(admin_url, api_url, auth, uuid):
+    if interfaces is None:
+        interfaces = _get_interfaces()
+    pairs = [(mac.upper(), interface)
+             for mac in addresses for interface in interfaces]
+    if not pairs:
+        raise NodeNotFound()
+    q = ' or '.join(
+        'facts.net.interface.{iface}.mac_address:"{mac}"'.format(
+            iface=interface, mac=mac)
+        for (mac, interface) in pairs)
+
+    contexts = client.get('/katello/api/v2/systems', search=q,
+                          organization_id=client.organization)['results']
+    if not contexts:
+        raise NodeNotFound()
+
+    def rank(context):
+        facts = context.get('facts') or {}
+        for i, (mac, interface) in enumerate(pairs):
+            key = 'net.interface.{iface}.mac_address'.format(iface=interface)
+            if (facts.get(key) or '').upper() == mac:
+                return i
+        return len(pairs)
+
+    return min(contexts, key=rank)['uuid']
+
+
+def _get_errata_data(client, uuid):
     """Get the errata here, while it's hot."""
 
-    url = '{url}/katello/api/v2/systems/{id}/errata'.format(url=api_url,
-                                                            id=uuid)
-    r = requests.get(url, auth=auth, verify=VERIFY_SSL)
-    r.raise_for_status()  # Raise an error if the request failed
-    errata = r.json()['results']
+    path = '/katello/api/v2/systems/{id}/errata'.format(id=uuid)
+    errata = client.get(path)['results']
     if not errata:
         raise NoErrataError()
     data = [ErrataItem(x['title'], x['type'], x['errata_id'], uuid,
-            x['issued'], admin_url) for x in errata]
+            x['issued'], client.admin_url) for x in errata]
     return data
 
 
+def _errata_cache_key(client, uuid):
+    return 'tuskar_sat_ui:errata:{url}:{id}'.format(url=client.api_url,
+                                                    id=uuid)
+
+
+def _refresh_errata(client, uuid):
+    """Get the errata from Satellite and put them in the cache."""
+
+    ttl = getattr(settings, ERRATA_CACHE_TTL, DEFAULT_ERRATA_CACHE_TTL)
+    stale_ttl = getattr(settings, ERRATA_CACHE_STALE_TTL,
+                        DEFAULT_ERRATA_CACHE_STALE_TTL)
+    as_of = time.time()
+    try:
+        data = _get_errata_data(client, uuid)
+    except NoErrataError:
+        data = []
+    cache.cache.set(_errata_cache_key(client, uuid), (as_of, data),
+                    max(ttl, stale_ttl))
+    return as_of, data
+
+
+def _refresh_errata_later(client, uuid):
+    key = _errata_cache_key(client, uuid)
+    try:
+        _refresh_errata(client, uuid)
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            # Let the next page view look the host up again.
+            cache.cache.delete(key)
+        LOG.warning("Could not refresh the errata of %s.", uuid,
+                    exc_info=True)
+    except Exception:
+        LOG.warning("Could not refresh the errata of %s.", uuid,
+                    exc_info=True)
+    finally:
+        cache.cache.delete(key + ':refresh')
+
+
+def _get_cached_errata(client, uuid):
+    """Get the errata, and the time they were fetched at.
+
+    The errata are kept in the cache for SATELLITE_ERRATA_CACHE_TTL
+    seconds. After that they are still served, while they are refreshed in
+    the background, for up to SATELLITE_ERRATA_CACHE_STALE_TTL seconds.
+    """
+
+    ttl = getattr(settings, ERRATA_CACHE_TTL, DEFAULT_ERRATA_CACHE_TTL)
+    if not ttl:
+        return time.time(), _get_errata_data(client, uuid)
+    key = _errata_cache_key(client, uuid)
+    cached = cache.cache.get(key)
+    if cached is None:
+        as_of, data = _refresh_errata(client, uuid)
+    else:
+        as_of, data = cached
+        # Only one refresh at a time, even across the processes.
+        if (time.time() - as_of >= ttl and
+                cache.cache.add(key + ':refresh', True,
+                                ERRATA_REFRESH_TIMEOUT)):
+            thread = threading.Thread(target=_refresh_errata_later,
+                                      args=(client, uuid))
+            thread.daemon = True
+            thread.start()
+    if not data:
+        raise NoErrataError()
+    return as_of, data
+
+
+def _find_node_errata(client, node):
+    """Get the errata of the node, using the remembered Satellite host.
+
+    The mapping is only checked when it's used: if Satellite doesn't know
+    the remembered host anymore, the host is searched for again. Returns
+    the time the errata were fetched at, and the errata.
+    """
+
+    mapping = models.host_mapping()
+    uuid = mapping.get(node.uuid, node.addresses)
+    if uuid is not None:
+        try:
+            return _get_cached_errata(client, uuid)
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+        mapping.forget(node.uuid)
+    uuid = _find_uuid_by_mac(client, node.addresses)
+    mapping.set(node.uuid, node.addresses, uuid)
+    return _get_cached_errata(client, uuid)
+
+
+def get_errata_table(request, node):
+    """Get the table of the node's errata.
+
+    A node without errata gets an empty table. Raises ErrataUnavailable
+    with the message to show instead, when the errata can't be fetched.
+    """
+
+    try:
+        client = _get_client()
+    except NoConfigError as e:
+        raise ErrataUnavailable(_(
+            "No Satellite configuration found. "
+            "Missing parameter %r."
+        ) % e.param)
+    except BadAuthError as e:
+        raise ErrataUnavailable(_(
+            "Satellite configuration error, "
+            "unknown authentication method %r."
+        ) % e.auth)
+
+    try:
+        as_of, data = _find_node_errata(client, node)
+    except NodeNotFound:
+        raise ErrataUnavailable(_("The node is not registered in Satellite."))
+    except NoErrataError:
+        return tables.ErrataTable(request, data=[])
+    except requests.RequestException:
+        LOG.warning("Could not fetch the errata of node %s from Satellite.",
+                    node.uuid, exc_info=True)
+        raise ErrataUnavailable(_("Could not fetch errata"))
+    return tables.ErrataTable(
+        request, data=data,
+        as_of=datetime.datetime.fromtimestamp(as_of, timezone.utc))
+
+
 class DetailOverviewTab(nodes_tabs.DetailOverviewTab):
     template_name = 'infrastructure/nodes/_detail_overview_sat.html'
 
@@ -178,33 +371,10 @@ class DetailOverviewTab(nodes_tabs.DetailOverviewTab):
         if context['node'].uuid is None:
             return context
 
-        try:
-            admin_url, api_url, auth, organization = _get_satellite_config()
-        except NoConfigError as e:
-            horizon.messages.error(request, _(
-                "No Satellite configuration found. "
-                "Missing parameter %r."
-            ) % e.param)
-            return context
-        except BadAuthError as e:
-            horizon.messages.error(request, _(
-                "Satellite configuration error, "
-                "unknown authentication method %r."
-            ) % e.auth)
-            return context
-
-        addresses = context['node'].addresses
-        try:
-            uuid = _find_uuid_by_mac(api_url, auth, organization, addresses)
-        except NodeNotFound:
-            return context
-
-        # TODO(rdopiera) Should probably catch that requests exception here.
-        try:
-            data = _get_errata_data(admin_url, api_url, auth, uuid)
-        except NoErrataError:
-            return context
-        context['errata'] = tables.ErrataTable(request, data=data)
+        # Satellite can be slow, so the errata are loaded separately.
+        context['errata_url'] = urlresolvers.reverse(
+            'horizon:infrastructure:nodes:errata',
+            args=(context['node'].uuid,))
         return context
 
 
@@ -12,8 +12,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
+import shutil
+import tempfile
+
+from django.core import cache
+from django.core import urlresolvers
+import mock
+import requests
 from tuskar_ui.test import helpers
 
+from tuskar_sat_ui import client as sat_client
+from tuskar_sat_ui import models
 from tuskar_sat_ui.nodes import tabs
 
 
@@ -108,3 +118,260 @@ class SatTests(helpers.BaseAdminViewTests):
             with self.assertRaises(tabs.BadAuthError) as e:
                 api_url, api_url_url, auth, org = tabs._get_satellite_config()
             self.assertEqual(e.exception.auth, 'bad')
+
+    def test_host_mapping(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        mapping = models.HostMapping(os.path.join(tmpdir, 'hosts.db'))
+
+        self.assertIsNone(mapping.get('node-1', ['aa:bb']))
+        mapping.set('node-1', ['aa:bb', 'cc:dd'], 'host-1')
+        self.assertEqual(mapping.get('node-1', ['CC:DD', 'AA:BB']), 'host-1')
+        # The entry isn't valid for other addresses.
+        self.assertIsNone(mapping.get('node-1', ['aa:bb']))
+        mapping.forget('node-1')
+        self.assertIsNone(mapping.get('node-1', ['aa:bb', 'cc:dd']))
+
+    def test_host_mapping_unusable(self):
+        mapping = models.HostMapping('/nonexistent/hosts.db')
+        mapping.set('node-1', ['aa:bb'], 'host-1')
+        self.assertIsNone(mapping.get('node-1', ['aa:bb']))
+
+    def test_host_mapping_path(self):
+        with self.settings(**{
+            models.HOST_MAPPING_DB: None,
+            'LOCAL_PATH': '/srv/dashboard/local',
+        }):
+            self.assertEqual(models.host_mapping().path,
+                             '/srv/dashboard/local/' + models.DEFAULT_DB_NAME)
+        with self.settings(**{
+            models.HOST_MAPPING_DB: None,
+            'LOCAL_PATH': None,
+        }):
+            mapping = models.host_mapping()
+            self.assertIsInstance(mapping, models.NoHostMapping)
+            mapping.set('node-1', ['aa:bb'], 'host-1')
+            self.assertIsNone(mapping.get('node-1', ['aa:bb']))
+
+    def test_find_node_errata(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        node = mock.Mock(uuid='node-1', addresses=['aa:bb'])
+        not_found = requests.HTTPError(response=mock.Mock(status_code=404))
+
+        with self.settings(**{
+            models.HOST_MAPPING_DB: os.path.join(tmpdir, 'hosts.db'),
+        }), mock.patch(
+            'tuskar_sat_ui.nodes.tabs._find_uuid_by_mac',
+            side_effect=['host-1', 'host-2'],
+        ) as find, mock.patch(
+            'tuskar_sat_ui.nodes.tabs._get_cached_errata',
+            side_effect=['errata-1', 'errata-1', not_found, 'errata-2'],
+        ) as get_errata:
+            args = ('client', node)
+            self.assertEqual(tabs._find_node_errata(*args), 'errata-1')
+            # The host is remembered, no search this time.
+            self.assertEqual(tabs._find_node_errata(*args), 'errata-1')
+            self.assertEqual(find.call_count, 1)
+            # The host is gone from Satellite, so search for it again.
+            self.assertEqual(tabs._find_node_errata(*args), 'errata-2')
+            self.assertEqual(find.call_count, 2)
+            self.assertEqual(get_errata.call_args_list[-1],
+                             mock.call('client', 'host-2'))
+            self.assertEqual(models.host_mapping().get('node-1', ['aa:bb']),
+                             'host-2')
+
+    def test_find_uuid_by_mac(self):
+        client = mock.Mock(organization='ACME', **{'get.return_value': {
+            'results': [
+                {'uuid': 'host-1', 'facts': {
+                    'net.interface.eth1.mac_address': 'CC:DD',
+                }},
+                {'uuid': 'host-2', 'facts': {
+                    'net.interface.eth0.mac_address': 'AA:BB',
+                }},
+            ],
+        }})
+
+        uuid = tabs._find_uuid_by_mac(client, ['aa:bb', 'cc:dd'],
+                                      interfaces=['eth0', 'eth1'])
+        self.assertEqual(uuid, 'host-2')
+        self.assertEqual(client.get.call_count, 1)
+        self.assertEqual(client.get.call_args[1], {
+            'search': ' or '.join([
+                'facts.net.interface.eth0.mac_address:"AA:BB"',
+                'facts.net.interface.eth1.mac_address:"AA:BB"',
+                'facts.net.interface.eth0.mac_address:"CC:DD"',
+                'facts.net.interface.eth1.mac_address:"CC:DD"',
+            ]),
+            'organization_id': 'ACME',
+        })
+
+    def test_find_uuid_by_mac_not_found(self):
+        client = mock.Mock(**{'get.return_value': {'results': []}})
+        config = {
+            tabs.SAT_CONFIG: {
+                tabs.SAT_INTERFACES_PARAM: ['em1'],
+            },
+        }
+
+        with self.settings(**config):
+            with self.assertRaises(tabs.NodeNotFound):
+                tabs._find_uuid_by_mac(client, ['aa:bb'])
+        self.assertEqual(client.get.call_args[1]['search'],
+                         'facts.net.interface.em1.mac_address:"AA:BB"')
+
+    def test_client(self):
+        config = {
+            tabs.SAT_CONFIG: {
+                tabs.SAT_HOST_PARAM: 'http://example.com/',
+                tabs.SAT_AUTH_PARAM: 'basic:user:pass',
+                tabs.SAT_ORG_PARAM: 'ACME',
+                tabs.SAT_TIMEOUT_PARAM: [1, 2],
+            },
+        }
+        response = mock.Mock(**{'json.return_value': {'results': []}})
+
+        with self.settings(**config):
+            client = tabs._get_client()
+            # The client, with its connections, is reused.
+            self.assertIs(tabs._get_client(), client)
+        self.assertEqual(client.session.auth, ('user', 'pass'))
+        with mock.patch.object(client.session, 'get',
+                               return_value=response) as get:
+            client.get('/katello/api/v2/systems', search='q')
+        get.assert_called_once_with(
+            'http://example.com/katello/api/v2/systems',
+            params={'search': 'q'}, timeout=(1, 2))
+
+    def test_client_timeout(self):
+        client = sat_client.SatelliteClient('http://example.com',
+                                            'http://example.com',
+                                            ('user', 'pass'), 'ACME',
+                                            timeout=10)
+        self.assertEqual(client.timeout, 10)
+        client = sat_client.SatelliteClient('http://example.com',
+                                            'http://example.com',
+                                            ('user', 'pass'), 'ACME',
+                                            timeout=[5, 30])
+        self.assertEqual(client.timeout, (5, 30))
+
+    def test_errata_table_request_error(self):
+        node = mock.Mock(uuid='node-1', addresses=['aa:bb'])
+        config = {
+            tabs.SAT_CONFIG: {
+                tabs.SAT_HOST_PARAM: 'http://example.com/',
+                tabs.SAT_AUTH_PARAM: 'basic:user:pass',
+                tabs.SAT_ORG_PARAM: 'ACME',
+            },
+        }
+
+        for error in (requests.Timeout(), requests.ConnectionError(),
+                      requests.HTTPError(response=mock.Mock(status_code=500))):
+            with self.settings(**config), mock.patch(
+                'tuskar_sat_ui.nodes.tabs._find_node_errata',
+                side_effect=error,
+            ):
+                with self.assertRaises(tabs.ErrataUnavailable) as raised:
+                    tabs.get_errata_table(mock.Mock(), node)
+                self.assertEqual(raised.exception.message,
+                                 'Could not fetch errata')
+
+    def test_errata_table_no_errata(self):
+        node = mock.Mock(uuid='node-1', addresses=['aa:bb'])
+        config = {
+            tabs.SAT_CONFIG: {
+                tabs.SAT_HOST_PARAM: 'http://example.com/',
+                tabs.SAT_AUTH_PARAM: 'basic:user:pass',
+                tabs.SAT_ORG_PARAM: 'ACME',
+            },
+        }
+
+        with self.settings(**config), mock.patch(
+            'tuskar_sat_ui.nodes.tabs._find_node_errata',
+            side_effect=tabs.NoErrataError(),
+        ):
+            table = tabs.get_errata_table(mock.Mock(), node)
+        self.assertEqual(list(table.data), [])
+        self.assertIsNone(table.as_of)
+
+        with self.settings(**config), mock.patch(
+            'tuskar_sat_ui.nodes.tabs._find_node_errata',
+            side_effect=tabs.NodeNotFound(),
+        ):
+            with self.assertRaises(tabs.ErrataUnavailable) as raised:
+                tabs.get_errata_table(mock.Mock(), node)
+        self.assertEqual(raised.exception.message,
+                         'The node is not registered in Satellite.')
+
+    def test_errata_view(self):
+        node = mock.Mock(uuid='node-1', addresses=['aa:bb'])
+        errata = mock.Mock(as_of=None,
+                           **{'render.return_value': 'The errata table'})
+        url = urlresolvers.reverse('horizon:infrastructure:nodes:errata',
+                                   args=('node-1',))
+
+        with mock.patch('tuskar_ui.api.node.Node.get',
+                        return_value=node), mock.patch(
+            'tuskar_sat_ui.nodes.tabs.get_errata_table',
+            side_effect=[errata,
+                         tabs.ErrataUnavailable('Could not fetch errata')],
+        ) as get_errata_table:
+            res = self.client.get(url)
+            self.assertTemplateUsed(res, 'infrastructure/nodes/_errata.html')
+            self.assertContains(res, 'The errata table')
+            get_errata_table.assert_called_once_with(mock.ANY, node)
+
+            res = self.client.get(url)
+            self.assertContains(res, 'Could not fetch errata')
+            self.assertNotContains(res, 'The errata table')
+
+    def test_errata_table_no_config(self):
+        node = mock.Mock(uuid='node-1', addresses=['aa:bb'])
+
+        with mock.patch(
+            'tuskar_sat_ui.nodes.tabs._find_node_errata',
+        ) as find, mock.patch('horizon.messages.error') as error:
+            with self.assertRaises(tabs.ErrataUnavailable) as raised:
+                tabs.get_errata_table(mock.Mock(), node)
+        # The message is shown in the errata fragment, not as a page
+        # message.
+        self.assertIn('No Satellite configuration found',
+                      raised.exception.message)
+        self.assertFalse(error.called)
+        self.assertFalse(find.called)
+
+    def test_cached_errata(self):
+        cache.cache.clear()
+        client = mock.Mock(api_url='http://example.com')
+        config = {
+            tabs.ERRATA_CACHE_TTL: 60,
+            tabs.ERRATA_CACHE_STALE_TTL: 600,
+        }
+
+        with self.settings(**config), mock.patch(
+            'tuskar_sat_ui.nodes.tabs._get_errata_data',
+            side_effect=['errata-1', 'errata-2'],
+        ) as get_errata, mock.patch(
+            'time.time', return_value=1000,
+        ) as now, mock.patch('threading.Thread') as thread:
+            self.assertEqual(tabs._get_cached_errata(client, 'host-1'),
+                             (1000, 'errata-1'))
+            self.assertEqual(tabs._get_cached_errata(client, 'host-1'),
+                             (1000, 'errata-1'))
+            self.assertEqual(get_errata.call_count, 1)
+            self.assertFalse(thread.called)
+
+            # Stale errata are served while they are refreshed.
+            now.return_value = 1100
+            self.assertEqual(tabs._get_cached_errata(client, 'host-1'),
+                             (1000, 'errata-1'))
+            self.assertEqual(thread.call_count, 1)
+            self.assertEqual(tabs._get_cached_errata(client, 'host-1'),
+                             (1000, 'errata-1'))
+            # Only one refresh at a time.
+            self.assertEqual(thread.call_count, 1)
+            thread.call_args[1]['target'](*thread.call_args[1]['args'])
+            self.assertEqual(tabs._get_cached_errata(client, 'host-1'),
+                             (1100, 'errata-2'))
+            self.assertEqual(get_errata.call_count, 2)
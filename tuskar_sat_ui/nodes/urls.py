@@ -20,6 +20,9 @@ from tuskar_sat_ui.nodes import views as sat_views
 
 urlpatterns = [url for url in tuskar_urls.urlpatterns if url.name != 'detail']
 urlpatterns.extend(urls.patterns(
+    '',
     urls.url(r'^(?P<node_uuid>[^/]+)/$', sat_views.DetailView.as_view(),
              name='detail'),
+    urls.url(r'^(?P<node_uuid>[^/]+)/errata/$',
+             sat_views.ErrataView.as_view(), name='errata'),
 ))
@@ -12,6 +12,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from django.views import generic
+from tuskar_ui import api
 from tuskar_ui.infrastructure.nodes import views
 
 from tuskar_sat_ui.nodes import tabs
@@ -19,3 +21,16 @@ from tuskar_sat_ui.nodes import tabs
 
 class DetailView(views.DetailView):
     tab_group_class = tabs.NodeDetailTabs
+
+
+class ErrataView(generic.TemplateView):
+    template_name = 'infrastructure/nodes/_errata.html'
+
+    def get_context_data(self, **kwargs):
+        context = super(ErrataView, self).get_context_data(**kwargs)
+        node = api.node.Node.get(self.request, kwargs['node_uuid'])
+        try:
+            context['errata'] = tabs.get_errata_table(self.request, node)
+        except tabs.ErrataUnavailable as e:
+            context['message'] = e.message
+        return context
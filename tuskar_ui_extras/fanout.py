@@ -0,0 +1,177 @@
+# -*- coding: utf8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Concurrent calls to independent backends.
+
+A page that asks Ironic, Nova, Tuskar and Heat one after another waits for
+the sum of their latencies. :func:`fan_out` runs such independent calls on
+a bounded pool of threads shared by the whole process instead, so the page
+only waits for the slowest of them. Every call succeeds or fails on its
+own, and a call that doesn't finish within its timeout is given up on.
+The calls never wait in a queue: when all the threads are busy, they are
+made in the calling thread instead.
+"""
+
+import collections
+import functools
+import logging
+import Queue
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_TIMEOUT = 30
+
+
+class FanOutTimeout(Exception):
+    """The call didn't finish within its timeout."""
+
+
+class Outcome(collections.namedtuple('Outcome', ['value', 'error'])):
+    """The value returned by a call, or the exception it raised."""
+    __slots__ = ()
+
+    def get(self):
+        """Returns the value, or raises the error of the call."""
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class Pool(object):
+    """Runs the submitted functions on at most max_workers threads.
+
+    The threads are started when they are first needed, and then kept
+    for the life of the process. A function is only accepted when a
+    thread is free to run it right away.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._queue = Queue.Queue()
+        self._workers = []
+        self._idle = 0
+        self._lock = threading.Lock()
+
+    def submit(self, function):
+        """Hands the function to a free thread.
+
+        Returns False, without running the function, when all the threads
+        are busy.
+        """
+        with self._lock:
+            if not self._idle:
+                if len(self._workers) >= self.max_workers:
+                    return False
+                thread = threading.Thread(target=self._work)
+                # Don't let a call that was given up on keep the process.
+                thread.daemon = True
+                self._workers.append(thread)
+                self._idle += 1
+                thread.start()
+            self._idle -= 1
+        self._queue.put(function)
+        return True
+
+    def _work(self):
+        while True:
+            function = self._queue.get()
+            try:
+                function()
+            except Exception:
+                LOG.exception("Pooled call failed.")
+            finally:
+                with self._lock:
+                    self._idle += 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the pool shared by the whole process."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = Pool()
+        return _pool
+
+
+class _Task(object):
+    def __init__(self, name, function):
+        self.name = name
+        self.function = function
+        self.done = False
+        self.outcome = None
+        self.deadline = None
+
+    def run(self, condition):
+        try:
+            outcome = Outcome(self.function(), None)
+        except Exception as e:
+            LOG.debug("Call %s failed.", self.name, exc_info=True)
+            outcome = Outcome(None, e)
+        with condition:
+            if not self.done:
+                self.outcome = outcome
+                self.done = True
+            condition.notify_all()
+
+    def expire(self, timeout):
+        LOG.warning("Call %s took longer than %.1fs, giving up on it.",
+                    self.name, timeout)
+        self.outcome = Outcome(None, FanOutTimeout(self.name))
+        self.done = True
+
+
+def fan_out(calls, timeout=DEFAULT_TIMEOUT, pool=None):
+    """Runs the independent calls concurrently and returns their outcomes.
+
+    The calls are given as a dict of names to functions without
+    arguments, and run on the given pool, or on the shared one. Each call
+    is given up on timeout seconds after it started. The calls that find
+    no free thread in the pool are made in the calling thread, while the
+    others run. Returns a dict of the same names to the :class:`Outcome`
+    of each call.
+    """
+    if pool is None:
+        pool = get_pool()
+    tasks = [_Task(name, function) for (name, function) in calls.items()]
+    condition = threading.Condition()
+    inline = []
+    for task in tasks:
+        task.deadline = time.time() + timeout
+        if not pool.submit(functools.partial(task.run, condition)):
+            inline.append(task)
+    if inline:
+        LOG.debug("No free threads, making %d calls in this thread.",
+                  len(inline))
+    for task in inline:
+        task.run(condition)
+    with condition:
+        while True:
+            pending = [task for task in tasks if not task.done]
+            if not pending:
+                break
+            now = time.time()
+            for task in pending:
+                if task.deadline <= now:
+                    task.expire(timeout)
+            deadlines = [task.deadline for task in pending if not task.done]
+            if not deadlines:
+                break
+            condition.wait(min(deadlines) - now)
+    return dict((task.name, task.outcome) for task in tasks)
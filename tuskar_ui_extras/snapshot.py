@@ -0,0 +1,109 @@
+# -*- coding: utf8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Request-scoped snapshots of the Tuskar UI API calls.
+
+A single page render tends to ask the backends the same questions several
+times. Wrapping those calls with :func:`call` makes every distinct call go
+to the backend at most once per request, and reuses the result for the
+rest of that request.
+"""
+
+import collections
+import logging
+
+LOG = logging.getLogger(__name__)
+SNAPSHOT_ATTRIBUTE = '_tuskar_ui_extras_snapshot'
+
+
+def _describe(function):
+    owner = getattr(function, '__self__', None)
+    name = getattr(function, '__name__', None) or repr(function)
+    if isinstance(owner, type):
+        return '%s.%s' % (owner.__name__, name)
+    return name
+
+
+class Snapshot(object):
+    """Remembers the results of the API calls made during one request."""
+
+    def __init__(self):
+        self.results = {}
+        self.avoided = collections.Counter()
+
+    def call(self, function, request, *args, **kwargs):
+        try:
+            key = (function, args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            # Unhashable arguments, we can't remember this call.
+            return function(request, *args, **kwargs)
+        try:
+            result = self.results[key]
+        except KeyError:
+            result = function(request, *args, **kwargs)
+            self.results[key] = result
+        else:
+            self.avoided[_describe(function)] += 1
+        return result
+
+    def invalidate(self):
+        """Forgets all results, for example after the data was changed."""
+        self.results.clear()
+
+
+def get_snapshot(request):
+    """Returns the snapshot of the given request, creating it if needed."""
+    snapshot = getattr(request, SNAPSHOT_ATTRIBUTE, None)
+    if snapshot is None:
+        snapshot = Snapshot()
+        setattr(request, SNAPSHOT_ATTRIBUTE, snapshot)
+    return snapshot
+
+
+def call(request, function, *args, **kwargs):
+    """Calls the API function at most once per request for given arguments.
+
+    The request is passed to the function as its first argument.
+    """
+    return get_snapshot(request).call(function, request, *args, **kwargs)
+
+
+def invalidate(request):
+    """Makes the subsequent calls in this request reach the backends."""
+    get_snapshot(request).invalidate()
+
+
+def log_summary(request):
+    snapshot = getattr(request, SNAPSHOT_ATTRIBUTE, None)
+    if snapshot is None or not snapshot.avoided:
+        return
+    LOG.debug(
+        "Avoided %d duplicate API calls for %s: %s",
+        sum(snapshot.avoided.values()),
+        request.path,
+        ", ".join("%s (%d)" % item
+                  for item in sorted(snapshot.avoided.items())),
+    )
+
+
+class SnapshotMixin(object):
+    """Logs the API calls avoided by the snapshot after every request."""
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super(SnapshotMixin, self).dispatch(request,
+                                                       *args, **kwargs)
+        finally:
+            log_summary(request)
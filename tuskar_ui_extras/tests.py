@@ -0,0 +1,116 @@
+# -*- coding: utf8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+import mock
+from tuskar_ui.test import helpers
+
+from tuskar_ui_extras import fanout
+from tuskar_ui_extras import snapshot
+
+
+class SnapshotTests(helpers.TestCase):
+    def test_call(self):
+        function = mock.Mock(return_value=[1, 2, 3])
+
+        first = snapshot.call(self.request, function, maintenance=False)
+        second = snapshot.call(self.request, function, maintenance=False)
+        self.assertIs(first, second)
+        function.assert_called_once_with(self.request, maintenance=False)
+
+        snapshot.call(self.request, function, maintenance=True)
+        self.assertEqual(function.call_count, 2)
+        self.assertEqual(
+            sum(snapshot.get_snapshot(self.request).avoided.values()), 1)
+
+    def test_invalidate(self):
+        function = mock.Mock(return_value=[])
+
+        snapshot.call(self.request, function)
+        snapshot.invalidate(self.request)
+        snapshot.call(self.request, function)
+        self.assertEqual(function.call_count, 2)
+
+    def test_unhashable_arguments(self):
+        function = mock.Mock(return_value=[])
+
+        snapshot.call(self.request, function, {'a': 1})
+        snapshot.call(self.request, function, {'a': 1})
+        self.assertEqual(function.call_count, 2)
+
+
+class FanOutTests(helpers.TestCase):
+    def test_fan_out(self):
+        def fail():
+            raise ValueError("Broken backend")
+
+        outcomes = fanout.fan_out({
+            'nodes': lambda: [1, 2, 3],
+            'flavors': fail,
+        })
+        self.assertEqual(outcomes['nodes'].get(), [1, 2, 3])
+        self.assertIsNone(outcomes['flavors'].value)
+        self.assertIsInstance(outcomes['flavors'].error, ValueError)
+        self.assertRaises(ValueError, outcomes['flavors'].get)
+
+    def test_fan_out_timeout(self):
+        release = threading.Event()
+
+        outcomes = fanout.fan_out({
+            'slow': lambda: release.wait(5),
+            'fast': lambda: 'done',
+        }, timeout=0.05)
+        release.set()
+        self.assertEqual(outcomes['fast'].get(), 'done')
+        self.assertRaises(fanout.FanOutTimeout, outcomes['slow'].get)
+
+    def test_fan_out_pool(self):
+        lock = threading.Lock()
+        counts = {'running': 0, 'most': 0}
+
+        def call():
+            with lock:
+                counts['running'] += 1
+                counts['most'] = max(counts['most'], counts['running'])
+            threading.Event().wait(0.01)
+            with lock:
+                counts['running'] -= 1
+            return threading.current_thread()
+
+        pool = fanout.Pool(max_workers=2)
+        outcomes = fanout.fan_out(dict((i, call) for i in range(6)),
+                                  pool=pool)
+        threads = set(outcome.get() for outcome in outcomes.values())
+        # Two calls ran on the pool, the others in this thread.
+        self.assertEqual(len(pool._workers), 2)
+        self.assertIn(threading.current_thread(), threads)
+        self.assertEqual(len(threads), 3)
+        self.assertLessEqual(counts['most'], 3)
+
+    def test_fan_out_pool_busy(self):
+        release = threading.Event()
+        pool = fanout.Pool(max_workers=1)
+
+        outcomes = fanout.fan_out({'hung': lambda: release.wait(5)},
+                                  timeout=0.05, pool=pool)
+        self.assertRaises(fanout.FanOutTimeout, outcomes['hung'].get)
+        try:
+            # The hung call still holds the only thread, so the next call
+            # is made right away in this one.
+            outcomes = fanout.fan_out({'next': threading.current_thread},
+                                      timeout=0.05, pool=pool)
+        finally:
+            release.set()
+        self.assertEqual(outcomes['next'].get(), threading.current_thread())